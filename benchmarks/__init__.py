@@ -0,0 +1 @@
+"""Headless benchmarks of the planning, vision and gripper hot paths, see benchmarks/run.py"""
@@ -0,0 +1,89 @@
+"""RobotiqGripper command round trips against a local fake of the gripper socket server"""
+
+import contextlib
+import socket
+import threading
+import time
+
+from benchmarks.harness import benchmark
+from robotiq_gripper import RobotiqGripper
+
+
+class FakeGripperServer:
+    """
+    Answers the SET/GET string protocol of the gripper URCap on a local port.
+
+    A requested position is reached at once: PRE and POS echo it and OBJ reports AT_DEST.
+    latency is added before every reply to model the network round trip to the robot.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.variables = {"ACT": 1, "GTO": 0, "ATR": 0, "ADR": 0, "FOR": 0, "SPE": 0, "POS": 0,
+                          "STA": 3, "PRE": 0, "OBJ": 3, "FLT": 0}
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, name="fake-gripper", daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        try:
+            connection, _ = self.server.accept()
+        except OSError:
+            return
+        with connection:
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            while True:
+                try:
+                    data = connection.recv(1024)
+                except OSError:
+                    return
+                if not data:
+                    return
+                if self.latency > 0:
+                    time.sleep(self.latency)
+                connection.sendall(self._reply(data.decode(RobotiqGripper.ENCODING).split()))
+
+    def _reply(self, words):
+        if words[0] == "GET":
+            return f"{words[1]} {self.variables[words[1]]}".encode(RobotiqGripper.ENCODING)
+        for variable, value in zip(words[1::2], words[2::2]):
+            self.variables[variable] = int(value)
+        if "POS" in words[1::2]:
+            self.variables["PRE"] = self.variables["POS"]
+        return b"ack"
+
+    def close(self):
+        self.server.close()
+
+
+@contextlib.contextmanager
+def connected_gripper(latency):
+    server = FakeGripperServer(latency)
+    gripper = RobotiqGripper()
+    gripper.connect("127.0.0.1", server.port)
+    try:
+        yield gripper
+    finally:
+        gripper.disconnect()
+        server.close()
+
+
+@benchmark("gripper.get_var")
+def get_var(options):
+    with connected_gripper(options.gripper_latency) as gripper:
+        yield lambda: gripper._get_var(RobotiqGripper.POS)
+
+
+@benchmark("gripper.set_var")
+def set_var(options):
+    with connected_gripper(options.gripper_latency) as gripper:
+        yield lambda: gripper._set_var(RobotiqGripper.SPE, 255)
+
+
+@benchmark("gripper.move_and_wait_for_pos")
+def move_and_wait_for_pos(options):
+    with connected_gripper(options.gripper_latency) as gripper:
+        positions = iter(range(1_000_000_000))
+        # Alternate the target, so every move is a change of position
+        yield lambda: gripper.move_and_wait_for_pos(next(positions) % 2 * 255, 255, 255)
@@ -0,0 +1,64 @@
+"""Toolpath generation and pixel to world conversion, run against a RobotMovements on the simulated robot"""
+
+import contextlib
+
+import numpy as np
+
+from benchmarks.harness import benchmark
+from robot_backend import SimulatedRobot
+from robot_movements import RobotMovements
+
+# Work areas in world coordinates (m), the large one is roughly the whole fixture
+SMALL_AREA = ((-0.25, -0.25), (-0.15, -0.35))
+LARGE_AREA = ((-0.47, 0.105), (0.16, -0.84))
+
+
+@contextlib.contextmanager
+def simulated_robot_movements():
+    """RobotMovements on a simulated robot whose motions take no time"""
+    robot = RobotMovements("simulated", backend=SimulatedRobot(time_scale=0.0))
+    try:
+        yield robot
+    finally:
+        robot.close()
+
+
+def _trajectory_path(area, tool_width):
+    def setup(options):
+        with simulated_robot_movements() as robot:
+            yield lambda: robot.generate_trajectory_path(area[0], area[1], robot.component_height, tool_width)
+    return setup
+
+
+benchmark("planning.generate_trajectory_path.small", tool_width=0.03)(_trajectory_path(SMALL_AREA, 0.03))
+benchmark("planning.generate_trajectory_path.large", tool_width=0.03)(_trajectory_path(LARGE_AREA, 0.03))
+benchmark("planning.generate_trajectory_path.large_fine", tool_width=0.005)(_trajectory_path(LARGE_AREA, 0.005))
+
+
+@benchmark("planning.get_toolpath.uncached", pattern="auto")
+def get_toolpath_uncached(options):
+    with simulated_robot_movements() as robot:
+        def plan():
+            robot.toolpath_cache.clear()
+            robot.get_toolpath(*SMALL_AREA)
+        yield plan
+
+
+@benchmark("planning.get_toolpath.cached", pattern="auto")
+def get_toolpath_cached(options):
+    with simulated_robot_movements() as robot:
+        robot.get_toolpath(*SMALL_AREA)
+        yield lambda: robot.get_toolpath(*SMALL_AREA)
+
+
+@benchmark("calibration.pixel_to_world")
+def pixel_to_world(options):
+    with simulated_robot_movements() as robot:
+        yield lambda: robot.pixel_to_world(260.0, 290.0)
+
+
+@benchmark("calibration.pixels_to_world", points=1000)
+def pixels_to_world(options):
+    pixels = np.random.default_rng(0).uniform((0, 0), (640, 480), size=(1000, 2))
+    with simulated_robot_movements() as robot:
+        yield lambda: robot.pixels_to_world(pixels)
@@ -0,0 +1,83 @@
+"""Grid overlay on synthetic frames and the per-frame gesture pipeline on a recorded video"""
+
+import os
+
+import numpy as np
+
+from benchmarks.harness import BenchmarkSkipped, benchmark
+from work_grid import WorkGrid
+
+
+def _import(module):
+    try:
+        return __import__(module)
+    except ImportError as e:
+        raise BenchmarkSkipped(f"{module} is not installed ({e})") from None
+
+
+def _grid_overlay(width, height, selected_area):
+    def setup(options):
+        _import("cv2")
+        terminal = _import("terminal")
+        # draw_grid only needs the grid labels, so the Tk window and camera are not created
+        interface = terminal.UserInterface.__new__(terminal.UserInterface)
+        grid = WorkGrid()
+        interface.rows = grid.column_labels
+        interface.cols = grid.row_labels
+        interface.corner_color = (0, 255, 0)
+        if selected_area:
+            interface.selected_area = {'start_row': 2, 'end_row': 6, 'start_col': 1, 'end_col': 5}
+        frame = np.random.default_rng(0).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        # draw_grid draws into the frame it gets, like update_frame every frame is a fresh copy
+        yield lambda: interface.draw_grid(frame.copy())
+    return setup
+
+
+benchmark("vision.draw_grid.640x480", width=640, height=480)(_grid_overlay(640, 480, False))
+benchmark("vision.draw_grid.640x480_selected", width=640, height=480)(_grid_overlay(640, 480, True))
+benchmark("vision.draw_grid.1280x720_selected", width=1280, height=720)(_grid_overlay(1280, 720, True))
+
+
+def _gesture_pipeline(**recognizer_options):
+    def setup(options):
+        yield from _run_gesture_pipeline(options, recognizer_options)
+    return setup
+
+
+def _run_gesture_pipeline(options, recognizer_options):
+    cv2 = _import("cv2")
+    _import("mediapipe")
+    gesture_control = _import("gesture_control")
+    if options.video is None:
+        raise BenchmarkSkipped("no video given, pass --video")
+    if not os.path.exists(options.model):
+        raise BenchmarkSkipped(f"model file {options.model} not found")
+
+    # Decode up front, so the benchmark measures the pipeline and not the video decoder
+    capture = cv2.VideoCapture(options.video)
+    frames = []
+    while len(frames) < options.frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise BenchmarkSkipped(f"could not read frames from {options.video}")
+
+    recognizer = gesture_control.GestureRecognizer(lambda gesture: None)
+    recognizer.start(options.model, **recognizer_options)
+    index = 0
+
+    def process():
+        nonlocal index
+        recognizer.process_frame(frames[index % len(frames)])
+        index += 1
+
+    yield process
+    recognizer.close()
+
+
+benchmark("vision.gesture_pipeline")(_gesture_pipeline())
+benchmark("vision.gesture_pipeline.roi_tracking", roi_tracking=True)(_gesture_pipeline(roi_tracking=True))
+benchmark("vision.gesture_pipeline.latency_budget", latency_budget=0.015)(_gesture_pipeline(latency_budget=0.015))
@@ -0,0 +1,93 @@
+"""Registry, timing loop and environment description shared by all benchmark modules"""
+
+import contextlib
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS = {}
+
+
+class BenchmarkSkipped(Exception):
+    """Raised during setup when a benchmark cannot run here, e.g. because of a missing dependency"""
+
+
+def benchmark(name, **params):
+    """
+    Register a benchmark.
+
+    The decorated function takes the command line options and yields the callable to time, code
+    before and after the yield is setup and teardown and is not timed. params are stored with the
+    results to tell apart variants of the same benchmark.
+    """
+    def decorator(function):
+        BENCHMARKS[name] = (contextlib.contextmanager(function), params)
+        return function
+    return decorator
+
+
+def measure(function, repeat=5, min_time=0.2, warmup=1):
+    """
+    Time function in repeat rounds of the same number of calls.
+
+    The number of calls per round is chosen so that a round takes at least min_time / repeat seconds,
+    so fast functions are not dominated by the timer resolution.
+    Returns:
+        dict: Seconds per call (min, median, mean, stdev, max over the rounds), rounds and calls per round
+    """
+    for _ in range(warmup):
+        function()
+
+    number = 1
+    target = min_time / repeat
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target or number >= 1_000_000:
+            break
+        number *= 10 if elapsed < target / 10 else 2
+
+    per_call = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        per_call.append((time.perf_counter() - start) / number)
+
+    return {
+        "min": min(per_call),
+        "median": statistics.median(per_call),
+        "mean": statistics.fmean(per_call),
+        "stdev": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "max": max(per_call),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def environment():
+    """Versions and machine the results were taken with"""
+    info = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    for module in ("numpy", "cv2", "mediapipe"):
+        try:
+            info[module] = __import__(module).__version__
+        except ImportError:
+            info[module] = None
+    try:
+        info["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                        check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        info["commit"] = None
+    info["argv"] = sys.argv[1:]
+    return info
@@ -0,0 +1,109 @@
+"""
+Run the benchmarks and write the results as JSON.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --video gestures.mp4 --filter vision
+    python -m benchmarks.run --output new.json --compare old.json
+
+No robot, camera or display is needed. Benchmarks whose dependencies are missing are listed
+under "skipped" with the reason instead of failing the run.
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import bench_gripper, bench_planning, bench_vision  # noqa: E402,F401 (register the benchmarks)
+from benchmarks.harness import BENCHMARKS, BenchmarkSkipped, environment, measure  # noqa: E402
+
+
+def run_benchmarks(options):
+    results = {}
+    skipped = {}
+    for name, (setup, params) in BENCHMARKS.items():
+        if options.filter and not any(fnmatch.fnmatch(name, f"*{pattern}*") for pattern in options.filter):
+            continue
+        output = io.StringIO()
+        try:
+            # The code under test prints progress, keep it out of the report
+            with contextlib.redirect_stdout(output), setup(options) as function:
+                timing = measure(function, repeat=options.repeat, min_time=options.min_time)
+        except BenchmarkSkipped as e:
+            skipped[name] = str(e)
+            print(f"{name:<48} skipped: {e}")
+            continue
+        except Exception as e:
+            skipped[name] = f"failed: {e!r}"
+            print(f"{name:<48} failed: {e!r}")
+            continue
+        results[name] = {"params": params, **timing}
+        print(f"{name:<48} {format_time(timing['median'])} per call (min {format_time(timing['min'])}, "
+              f"{timing['repeat']} x {timing['number']} calls)")
+    return results, skipped
+
+
+def format_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.2f} us"
+    if seconds < 1.0:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds:8.3f} s "
+
+
+def compare(baseline, results, threshold):
+    """Print the change of the median against a baseline, returns the names that got slower than threshold"""
+    regressions = []
+    print(f"\n{'benchmark':<48} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median"]
+        change = result["median"] / before - 1.0
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  slower"
+        print(f"{name:<48} {format_time(before)} {format_time(result['median'])} {change:+8.1%}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the planning, vision and gripper hot paths")
+    parser.add_argument("--output", metavar="FILE", help="Write the results as JSON to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against the results in FILE")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown of the median reported as a regression (default 0.1)")
+    parser.add_argument("--filter", nargs="*", help="Only run benchmarks whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed rounds per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent timing a benchmark")
+    parser.add_argument("--video", help="Recorded video for the gesture pipeline benchmark")
+    parser.add_argument("--frames", type=int, default=300, help="Frames of the video to use")
+    parser.add_argument("--model", default="gesture_recognizer.task", help="Gesture recognizer model file")
+    parser.add_argument("--gripper-latency", type=float, default=0.0,
+                        help="Reply delay of the fake gripper server in seconds")
+    options = parser.parse_args()
+
+    results, skipped = run_benchmarks(options)
+    report = {"environment": environment(), "benchmarks": results, "skipped": skipped}
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"Results written to {options.output}")
+
+    if options.compare:
+        with open(options.compare) as file:
+            baseline = json.load(file)["benchmarks"]
+        regressions = compare(baseline, results, options.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmarks more than {options.threshold:.0%} slower: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Mapping from camera pixels to robot world coordinates"""
+
+import numpy as np
+
+# Calibration correspondences: fixture corners in pixel and world coordinates (m)
+CALIBRATION_PIXELS = (
+    (194, 347),  # Bottom Left (A1)
+    (326, 343),  # Bottom Right (K1)
+    (198, 235),  # Top Left (A2)
+    (325, 238),  # Top Right (K2)
+)
+CALIBRATION_WORLD = (
+    (-0.29505, -0.20990),  # Bottom Left (A1)
+    (-0.30040, -0.43423),  # Bottom Right (K1)
+    (-0.09682, -0.21371),  # Top Left (A2)
+    (-0.09999, -0.44149),  # Top Right (K2)
+)
+
+
+def compute_homography(source_points, target_points):
+    """
+    Homography that maps four source points onto four target points.
+    Args:
+        source_points (array_like): (4, 2) points, no three of them collinear
+        target_points (array_like): (4, 2) points
+    Returns:
+        np.ndarray: 3x3 homography normalized to H[2, 2] = 1
+    """
+    source_points = np.asarray(source_points, dtype=float)
+    target_points = np.asarray(target_points, dtype=float)
+    if source_points.shape != (4, 2) or target_points.shape != (4, 2):
+        raise ValueError("A homography needs exactly four point correspondences")
+
+    # Two linear equations per correspondence for the eight unknowns h00 ... h21
+    system = np.zeros((8, 8))
+    rhs = np.zeros(8)
+    for i, ((u, v), (x, y)) in enumerate(zip(source_points, target_points)):
+        system[2 * i] = (u, v, 1, 0, 0, 0, -u * x, -v * x)
+        system[2 * i + 1] = (0, 0, 0, u, v, 1, -u * y, -v * y)
+        rhs[2 * i] = x
+        rhs[2 * i + 1] = y
+    return np.append(np.linalg.solve(system, rhs), 1.0).reshape(3, 3)
+
+
+class PixelToWorld:
+    """Perspective mapping of a tilted camera onto the work plane, computed once from four correspondences"""
+
+    def __init__(self, pixel_points=CALIBRATION_PIXELS, world_points=CALIBRATION_WORLD):
+        self.homography = compute_homography(pixel_points, world_points)
+
+    def transform(self, pixel_points):
+        """
+        Convert many pixel points in one call.
+        Args:
+            pixel_points (array_like): (N, 2) array of (pixel_x, pixel_y)
+        Returns:
+            np.ndarray: (N, 2) array of (world_x, world_y) in meters
+        """
+        pixel_points = np.asarray(pixel_points, dtype=float).reshape(-1, 2)
+        h = self.homography
+        u = pixel_points[:, 0]
+        v = pixel_points[:, 1]
+        w = h[2, 0] * u + h[2, 1] * v + h[2, 2]
+        world = np.empty_like(pixel_points)
+        world[:, 0] = (h[0, 0] * u + h[0, 1] * v + h[0, 2]) / w
+        world[:, 1] = (h[1, 0] * u + h[1, 1] * v + h[1, 2]) / w
+        return world
+
+    def __call__(self, pixel_x, pixel_y):
+        """Convert a single pixel point, returns (world_x, world_y) in meters"""
+        h = self.homography
+        w = h[2, 0] * pixel_x + h[2, 1] * pixel_y + h[2, 2]
+        world_x = (h[0, 0] * pixel_x + h[0, 1] * pixel_y + h[0, 2]) / w
+        world_y = (h[1, 0] * pixel_x + h[1, 1] * pixel_y + h[1, 2]) / w
+        return float(world_x), float(world_y)
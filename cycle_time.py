@@ -0,0 +1,146 @@
+"""Offline cycle-time estimation for movej/movel sequences"""
+
+import math
+
+import numpy as np
+
+from kinematics import cached_inverse_kinematics, forward_kinematics_pose, matrix_to_rotvec, rotvec_to_matrix
+
+
+def trapezoidal_time(distance, velocity, acceleration):
+    """
+    Duration of a rest-to-rest move with a trapezoidal velocity profile.
+
+    Short moves never reach the cruise velocity and use a triangular profile instead.
+    Args:
+        distance (float): Distance to travel (m or rad)
+        velocity (float): Maximum velocity (m/s or rad/s)
+        acceleration (float): Acceleration and deceleration (m/s^2 or rad/s^2)
+    Returns:
+        float: Duration in seconds
+    """
+    distance = abs(distance)
+    if distance == 0:
+        return 0.0
+    if velocity <= 0 or acceleration <= 0:
+        raise ValueError("Velocity and acceleration must be positive")
+    if distance <= velocity ** 2 / acceleration:
+        return 2 * math.sqrt(distance / acceleration)
+    return distance / velocity + velocity / acceleration
+
+
+def rotation_angle(pose_a, pose_b):
+    """Angle in radians between the orientations of two poses"""
+    relative = rotvec_to_matrix(pose_b[3:6]) @ rotvec_to_matrix(pose_a[3:6]).T
+    return float(np.linalg.norm(matrix_to_rotvec(relative)))
+
+
+class SegmentEstimate:
+    """Expected duration of a single movej/movel segment"""
+
+    def __init__(self, kind, target, duration, distance, motion=None):
+        self.kind = kind
+        self.target = target
+        self.duration = duration
+        self.distance = distance
+        # Motion a segment is executed with, differs from kind for transfer segments
+        self.motion = kind if motion is None else motion
+
+    def __repr__(self):
+        kind = self.kind if self.motion == self.kind else f"{self.kind} as {self.motion}"
+        return f"SegmentEstimate({kind}, duration={self.duration:.3f} s, distance={self.distance:.4f})"
+
+
+class CycleTimeEstimator:
+    """Kinematic timing model of the UR3e using trapezoidal velocity profiles"""
+
+    def __init__(self, acceleration=0.5, velocity=0.5, joint_acceleration=None, joint_velocity=None):
+        """
+        Args:
+            acceleration (float): Tool acceleration for movel (m/s^2)
+            velocity (float): Tool velocity for movel (m/s)
+            joint_acceleration (float): Leading axis acceleration for movej (rad/s^2), defaults to acceleration
+            joint_velocity (float): Leading axis velocity for movej (rad/s), defaults to velocity
+        """
+        self.acceleration = acceleration
+        self.velocity = velocity
+        # RobotMovements passes the same values to movej and movel
+        self.joint_acceleration = acceleration if joint_acceleration is None else joint_acceleration
+        self.joint_velocity = velocity if joint_velocity is None else joint_velocity
+
+    def movej_time(self, start_joints, target_joints):
+        """Duration of a movej, all joints are synchronized to the leading axis"""
+        distance = float(np.max(np.abs(np.subtract(target_joints, start_joints))))
+        return trapezoidal_time(distance, self.joint_velocity, self.joint_acceleration), distance
+
+    def movel_time(self, start_pose, target_pose):
+        """Duration of a movel, the slower of the translation and the tool rotation"""
+        distance = math.dist(start_pose[:3], target_pose[:3])
+        translation = trapezoidal_time(distance, self.velocity, self.acceleration)
+        rotation = trapezoidal_time(rotation_angle(start_pose, target_pose), self.joint_velocity,
+                                    self.joint_acceleration)
+        return max(translation, rotation), distance
+
+    def transfer_time(self, start_joints, start_pose, target_pose):
+        """
+        Pick the faster motion for a transfer segment that does not need a straight TCP path.
+
+        The target joints come from the flange kinematics, so the poses have to be those of a TCP
+        without offset, see kinematics.
+        Args:
+            start_joints (tuple): Joint angles at the start of the segment
+            start_pose (tuple): TCP pose at the start of the segment
+            target_pose (tuple): TCP pose to reach
+        Returns:
+            tuple: ("movej" or "movel", duration, distance, target joint angles)
+        """
+        target_joints = cached_inverse_kinematics(target_pose, start_joints)
+        joint_duration, joint_distance = self.movej_time(start_joints, target_joints)
+        linear_duration, linear_distance = self.movel_time(start_pose, target_pose)
+        if joint_duration < linear_duration:
+            return "movej", joint_duration, joint_distance, target_joints
+        return "movel", linear_duration, linear_distance, target_joints
+
+    def estimate(self, moves, start_joints):
+        """
+        Expected duration of every segment of a motion sequence.
+        Args:
+            moves (list): Sequence of ("movej", joints), ("movel", pose) or ("transfer", pose) tuples.
+                movel segments are process moves that keep the TCP on a straight line, transfer
+                segments run as whichever of movej and movel is faster.
+            start_joints (tuple): Joint angles of the robot before the first move
+        Returns:
+            list: SegmentEstimate for every move
+        """
+        joints = tuple(start_joints)
+        pose = forward_kinematics_pose(joints)
+        estimates = []
+        for kind, target in moves:
+            target = tuple(float(value) for value in target)
+            motion = kind
+            if kind == "movej":
+                if joints is None:
+                    # Joint configuration after linear moves, closest to the last known one
+                    joints = cached_inverse_kinematics(pose, last_joints)
+                duration, distance = self.movej_time(joints, target)
+                joints = target
+                pose = forward_kinematics_pose(target)
+            elif kind == "movel":
+                duration, distance = self.movel_time(pose, target)
+                if joints is not None:
+                    last_joints = joints
+                joints = None
+                pose = target
+            elif kind == "transfer":
+                if joints is None:
+                    joints = cached_inverse_kinematics(pose, last_joints)
+                motion, duration, distance, joints = self.transfer_time(joints, pose, target)
+                pose = target
+            else:
+                raise ValueError(f"Unknown move type: {kind}")
+            estimates.append(SegmentEstimate(kind, target, duration, distance, motion))
+        return estimates
+
+    def total_time(self, moves, start_joints):
+        """Expected duration of a whole motion sequence in seconds"""
+        return sum(segment.duration for segment in self.estimate(moves, start_joints))
@@ -1,16 +1,396 @@
+import argparse
 import cv2
 import mediapipe as mp
 from mediapipe.tasks import python
+import numpy as np
+import os
 import threading
 import time
+from collections import deque, namedtuple
+
+# Hand landmark topology of the mediapipe hand model (21 landmarks per hand)
+INDEX_FINGER_TIP = 8
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),  # Thumb
+    (0, 5), (5, 6), (6, 7), (7, 8),  # Index finger
+    (5, 9), (9, 10), (10, 11), (11, 12),  # Middle finger
+    (9, 13), (13, 14), (14, 15), (15, 16),  # Ring finger
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),  # Little finger and palm
+)
+
+
+# Landmark in normalized full frame coordinates, for landmarks detected in a crop
+Landmark = namedtuple("Landmark", "x y z")
+
+
+def hand_roi(hand_landmarks, width, height, padding=0.5, min_size=96):
+    """
+    Pixel box (x0, y0, x1, y1) around all hands, padded so the hands stay inside when they move.
+    Args:
+        hand_landmarks (list): Landmarks per hand in normalized coordinates
+        width, height (int): Frame size in pixels
+        padding (float): Margin on every side as a fraction of the larger box side
+        min_size (int): Smallest side of the box in pixels
+    """
+    xs = [landmark.x for landmarks in hand_landmarks for landmark in landmarks]
+    ys = [landmark.y for landmarks in hand_landmarks for landmark in landmarks]
+    x0, x1 = min(xs) * width, max(xs) * width
+    y0, y1 = min(ys) * height, max(ys) * height
+    margin = max(padding * max(x1 - x0, y1 - y0), 0.5 * min_size)
+    return (max(0, int(x0 - margin)), max(0, int(y0 - margin)),
+            min(width, int(x1 + margin)), min(height, int(y1 + margin)))
+
+
+def draw_hand(frame, landmarks):
+    """Draw the landmarks of one hand (normalized coordinates) and their connections into frame"""
+    height, width = frame.shape[:2]
+    points = [(int(landmark.x * width), int(landmark.y * height)) for landmark in landmarks]
+    for start, end in HAND_CONNECTIONS:
+        cv2.line(frame, points[start], points[end], (224, 224, 224), 2)
+    for point in points:
+        cv2.circle(frame, point, 3, (0, 0, 255), -1)
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+# Factor between two input scales tried to meet the latency budget
+SCALE_STEP = 0.85
+
+# Seconds a gesture has to be held before it is reported, gestures not listed use DEFAULT_HOLD_TIME
+GESTURE_HOLD_TIMES = {
+    "Area specification": 2.0,
+    "Error gesture": 0.1,
+}
+DEFAULT_HOLD_TIME = 0.3
+# Gestures that are only reported together with their data, e.g. the area corners
+DATA_GESTURES = ("Area specification",)
+
+
+class GestureStateMachine:
+    """
+    Confirms gestures from per-frame candidates, driven only by frame timestamps.
+
+    A gesture counts as shown while at least votes of the last window frames detected it, so single
+    misdetections neither start nor break it. votes has to be a majority of the window, so only one
+    gesture can be shown at a time. It is reported once it was shown for its hold time,
+    after that no gesture is reported during cooldown and until the reported one was released.
+    Nothing depends on the wall clock, a replay gives the same events as the live camera.
+    """
+
+    def __init__(self, window=8, votes=5, hold_times=None, default_hold_time=DEFAULT_HOLD_TIME, cooldown=1.0,
+                 data_gestures=DATA_GESTURES):
+        """
+        Args:
+            window (int): Number of recent frames that vote
+            votes (int): Frames of the window that have to agree, more than half of window
+            hold_times (dict): Hold time in seconds per gesture, defaults to GESTURE_HOLD_TIMES
+            default_hold_time (float): Hold time of gestures not in hold_times
+            cooldown (float): Seconds after a reported gesture in which nothing is reported
+            data_gestures (tuple): Gestures that are not reported while no voting frame carried data
+        """
+        if not window // 2 < votes <= window:
+            raise ValueError(f"votes has to be a majority of the window, got {votes} of {window}")
+        self.votes = votes
+        self.hold_times = dict(GESTURE_HOLD_TIMES if hold_times is None else hold_times)
+        self.default_hold_time = default_hold_time
+        self.cooldown = cooldown
+        self.data_gestures = tuple(data_gestures)
+        self.candidates = deque(maxlen=window)
+        self.frame_data = deque(maxlen=window)  # Data of every frame in candidates
+        self.gesture = None  # Gesture being held
+        self.since = None  # Timestamp in ms the gesture was first shown
+        self.reported = None  # Last reported gesture, has to be released before the next report
+        self.cooldown_until = None
+
+    def hold_time(self, gesture):
+        return self.hold_times.get(gesture, self.default_hold_time)
+
+    def shown(self):
+        """Gesture detected in enough frames of the window, None if there is none"""
+        counts = {}
+        for candidate in self.candidates:
+            if candidate is not None:
+                counts[candidate] = counts.get(candidate, 0) + 1
+        if not counts:
+            return None
+        gesture = max(counts, key=counts.get)
+        return gesture if counts[gesture] >= self.votes else None
+
+    def update(self, candidate, timestamp_ms, data=None):
+        """
+        Feed the gesture detected in one frame.
+        Args:
+            candidate (str): Gesture detected in the frame, None for none
+            timestamp_ms (int): Timestamp of the frame
+            data: Value reported with the gesture, e.g. the area corners
+        Returns:
+            tuple: (gesture, data) when a gesture is confirmed in this frame, otherwise None. data is
+                that of the newest voting frame that carried some
+        """
+        self.candidates.append(candidate)
+        self.frame_data.append(data)
+        shown = self.shown()
+
+        if self.reported is not None:
+            if shown == self.reported or timestamp_ms < self.cooldown_until:
+                return None
+            self.reported = None
+
+        if shown is None:
+            self.gesture = self.since = None
+            return None
+        if shown != self.gesture:
+            self.gesture = shown
+            self.since = timestamp_ms
+
+        if timestamp_ms - self.since < self.hold_time(shown) * 1000:
+            return None
+        data = next((frame_data for voted, frame_data in zip(reversed(self.candidates), reversed(self.frame_data))
+                     if voted == shown and frame_data is not None), None)
+        if data is None and shown in self.data_gestures:
+            # Keep holding until a voting frame brings the data
+            return None
+        self.reported = shown
+        self.cooldown_until = timestamp_ms + self.cooldown * 1000
+        self.gesture = self.since = None
+        self.candidates.clear()
+        self.frame_data.clear()
+        return shown, data
+
+    def progress(self, timestamp_ms):
+        """Fraction of the hold time the current gesture was held, None while no gesture is held"""
+        if self.gesture is None:
+            return None
+        hold = self.hold_time(self.gesture) * 1000
+        return min(1.0, (timestamp_ms - self.since) / hold) if hold > 0 else 1.0
+
+
+def read_frames(source, fps=30.0):
+    """
+    Frames of a recorded video file or of a directory of images, in order.
+    Args:
+        source (str): Video file, or directory whose image files are read in file name order
+        fps (float): Frame rate for the timestamps of a directory, or of a video that reports none
+    Yields:
+        tuple: (BGR frame, timestamp in ms since the first frame)
+    """
+    if os.path.isdir(source):
+        files = sorted(name for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for index, name in enumerate(files):
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is None:
+                print(f"Could not read {name}, skipped")
+                continue
+            yield frame, int(index * 1000 / fps)
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {source}")
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or fps
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame, int(index * 1000 / video_fps)
+            index += 1
+    finally:
+        cap.release()
+
+
+class LatestFrame:
+    """
+    Single slot between two pipeline stages, a new item replaces one that was not taken yet.
+
+    The consumer always gets the newest item instead of working through a backlog, replaced
+    items are counted in dropped.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self.put_count += 1
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Take the newest item, None if there was none within timeout or the slot is closed"""
+        with self._condition:
+            if self._item is None and not self._closed:
+                self._condition.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
 
 class GestureRecognizer:
     def __init__(self, gesture_callback):
         self.gesture_callback = gesture_callback
+        self.pipeline_stats = {}
+
+    def main(self, camera=4, **options):
+        """
+        Run capture, inference and display as a pipeline until ESC is pressed or the camera fails.
+
+        Capture and inference run on their own threads, connected by LatestFrame slots, so a slow
+        stage drops frames instead of delaying the following ones and gestures are always decided
+        on the newest frame. Display stays on the calling thread, as the OpenCV GUI requires.
+        options are passed to start, e.g. roi_tracking or latency_budget.
+        """
+        self.start(**options)
+        cap = cv2.VideoCapture(camera)
+        captured = LatestFrame()
+        annotated = LatestFrame()
+        stopped = threading.Event()
+        latency = [0.0]  # Summed capture to result time of all processed frames
 
-    def main(self):
+        def capture():
+            while not stopped.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                captured.put((frame, time.monotonic()))
+            stopped.set()
+            captured.close()
+
+        def inference():
+            while not stopped.is_set():
+                item = captured.get(timeout=0.1)
+                if item is None:
+                    continue
+                frame, capture_time = item
+                annotated.put(self.process_frame(frame, int(capture_time * 1000)))
+                latency[0] += time.monotonic() - capture_time
+            annotated.close()
+
+        threads = [threading.Thread(target=capture, name="gesture-capture", daemon=True),
+                   threading.Thread(target=inference, name="gesture-inference", daemon=True)]
+        for thread in threads:
+            thread.start()
+        start_time = time.monotonic()
+        shown = 0
+        try:
+            while not stopped.is_set():
+                frame = annotated.get(timeout=0.01)
+                if frame is not None:
+                    cv2.imshow('MediaPipe Hands', frame)
+                    shown += 1
+                # waitKey also keeps the window responsive while no new frame arrives
+                if cv2.waitKey(1) & 0xFF == 27:
+                    break
+        finally:
+            stopped.set()
+            for thread in threads:
+                thread.join()
+            cap.release()
+            self.close()
+
+        elapsed = time.monotonic() - start_time
+        self.pipeline_stats = {
+            "captured": captured.put_count,
+            "inference_dropped": captured.dropped,
+            "processed": annotated.put_count,
+            "display_dropped": annotated.dropped,
+            "shown": shown,
+            "fps": annotated.put_count / elapsed if elapsed > 0 else 0.0,
+            "mean_latency": latency[0] / annotated.put_count if annotated.put_count else None,
+            "input_scale": self.input_scale,
+            "inference_times": dict(self.inference_times),
+            **self.tracking_stats,
+        }
+        print(f"Gesture pipeline: {captured.put_count} frames captured, {annotated.put_count} processed "
+              f"({captured.dropped} dropped before inference, {annotated.dropped} before display)")
+
+    def replay(self, source, fps=30.0, **options):
+        """
+        Run the gesture pipeline on a recording as fast as possible, without camera or window.
+
+        Every frame is processed in VIDEO mode (crops with roi_tracking in IMAGE mode) with the timestamp
+        of the frame in the recording, so results do not depend on the processing speed.
+        Args:
+            source (str): Video file or directory of frames, see read_frames
+            fps (float): Frame rate of a directory of frames
+            options: Passed to start, e.g. model_path or roi_tracking
+        Returns:
+            dict: frames, seconds, fps, inference_time (moving average in seconds, per workload in
+                inference_times), the tracking counters and the events as (timestamp_ms, gesture)
+        """
+        self.start(video_mode=True, **options)
+        events = []
+        callback = self.gesture_callback
+
+        def record(gesture):
+            events.append((self.timestamp, gesture))
+            print(f"{self.timestamp / 1000:9.3f} s  {gesture}")
+            callback(gesture)
+
+        self.gesture_callback = record
+        frames = 0
+        start_time = time.perf_counter()
+        try:
+            for frame, timestamp_ms in read_frames(source, fps):
+                self.process_frame(frame, timestamp_ms)
+                frames += 1
+        finally:
+            self.gesture_callback = callback
+            self.close()
+        elapsed = time.perf_counter() - start_time
+
+        stats = {
+            "frames": frames,
+            "seconds": elapsed,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            "inference_time": self.inference_time,
+            "inference_times": dict(self.inference_times),
+            "events": events,
+            **self.tracking_stats,
+        }
+        print(f"Replayed {frames} frames in {elapsed:.2f} s ({stats['fps']:.1f} FPS), {len(events)} gesture events")
+        return stats
+
+    def start(self, model_path="gesture_recognizer.task", video_mode=True, roi_tracking=False,
+              redetect_interval=15, roi_padding=0.5, latency_budget=None, min_input_scale=0.25,
+              hold_times=None, vote_window=8, votes=5, cooldown=1.0):
+        """
+        Create the model, needed before process_frame.
+        Args:
+            model_path (str): Gesture recognizer model file
+            video_mode (bool): Recognize synchronously in VIDEO mode, the result belongs to the frame
+                that was passed in. False uses LIVE_STREAM mode, where results arrive asynchronously
+                and the latest one is drawn on the next frame
+            roi_tracking (bool): Pass only a padded box around the hands of the previous frame to a
+                second model in IMAGE mode, its own tracking would not follow the crop. Full frames
+                stay with the VIDEO mode model. Only used in VIDEO mode. The model resizes its input
+                itself, so the gain is small, measure it with the vision.gesture_pipeline benchmarks
+            redetect_interval (int): With roi_tracking, look at the full frame every this many frames
+                to find hands that entered the image
+            roi_padding (float): Margin around the hands as a fraction of the box size
+            latency_budget (float): Inference time per frame in seconds, the input is scaled down
+                while inference takes longer and scaled up again when there is time left.
+                Scaling down stops as soon as a step no longer makes inference faster, as the model
+                resizes its input itself. With roi_tracking only the crops are budgeted and scaled,
+                the full frame checks keep the full resolution. None always uses the full
+                resolution. Only used in the synchronous modes
+            min_input_scale (float): Smallest input scale used to meet the latency budget
+            hold_times (dict): Seconds per gesture until it is reported, see GestureStateMachine
+            vote_window, votes (int): A gesture is shown while detected in votes of vote_window frames
+            cooldown (float): Seconds after a reported gesture before the next one is reported
+        """
         num_hands = 2
-        model_path = "gesture_recognizer.task"
         GestureRecognizer = mp.tasks.vision.GestureRecognizer
         GestureRecognizerOptions = mp.tasks.vision.GestureRecognizerOptions
         VisionRunningMode = mp.tasks.vision.RunningMode
@@ -18,54 +398,163 @@ class GestureRecognizer:
         self.lock = threading.Lock()
         self.current_gestures = []
         self.hand_landmarks = []
-        self.timer_running = False
-        self.cooldown_active = False
         self.area_coordinates = None
-        options = GestureRecognizerOptions(
-            base_options=python.BaseOptions(model_asset_path=model_path),
-            running_mode=VisionRunningMode.LIVE_STREAM,
-            num_hands=num_hands,
-            result_callback=self.__result_callback)
-        recognizer = GestureRecognizer.create_from_options(options)
-
-        timestamp = 0
-        mp_drawing = mp.solutions.drawing_utils
-        mp_hands = mp.solutions.hands
-        hands = mp_hands.Hands(
-                static_image_mode=False,
-                max_num_hands=num_hands,
-                min_detection_confidence=0.65,
-                min_tracking_confidence=0.65)
-
-        cap = cv2.VideoCapture(4)
+        self.gesture_state = GestureStateMachine(vote_window, votes, hold_times, cooldown=cooldown)
+        running_mode = VisionRunningMode.VIDEO if video_mode else VisionRunningMode.LIVE_STREAM
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame = cv2.flip(frame, -1) # Bild drehen
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(frame)
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            np_array = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            if results.multi_hand_landmarks:
-                self.hand_landmarks = results.multi_hand_landmarks
-                for hand_landmarks in results.multi_hand_landmarks:
-                    mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-                    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np_array)
-                    recognizer.recognize_async(mp_image, timestamp)
-                    timestamp = timestamp + 1 # should be monotonically increasing, because in LIVE_STREAM mode
-
-                self.put_gestures(frame)
-
-            self.frame = frame
-            cv2.imshow('MediaPipe Hands', frame)
-            if cv2.waitKey(1) & 0xFF == 27:
-                break
+        def create(running_mode):
+            options = GestureRecognizerOptions(
+                base_options=python.BaseOptions(model_asset_path=model_path),
+                running_mode=running_mode,
+                num_hands=num_hands,
+                min_hand_detection_confidence=0.65,
+                min_hand_presence_confidence=0.65,
+                min_tracking_confidence=0.65,
+                result_callback=self.__result_callback if running_mode == VisionRunningMode.LIVE_STREAM else None)
+            return GestureRecognizer.create_from_options(options)
 
-        cap.release()
+        # The gesture recognizer detects the hands itself and returns their landmarks with the
+        # gestures, so one model pass per frame gives everything the gestures below need
+        self.recognizer = create(running_mode)
+        self.running_mode = running_mode
+        self.timestamp = 0
+
+        # The crops change from frame to frame, so they get their own model without tracking. The
+        # VIDEO mode model only sees the full frames, their timestamps are still increasing
+        self.roi_tracking = roi_tracking and video_mode
+        self.roi_recognizer = create(VisionRunningMode.IMAGE) if self.roi_tracking else None
+        self.redetect_interval = redetect_interval
+        self.roi_padding = roi_padding
+        self.frames_since_detection = 0
+        self.latency_budget = latency_budget
+        self.min_input_scale = min_input_scale
+        self.input_scale = 1.0
+        self.scale_step = 0  # input_scale is SCALE_STEP ** scale_step
+        self.step_times = {}  # Moving average of the inference time in seconds per scale step
+        self.inference_time = None  # Moving average in seconds
+        # Crops and full frames are timed apart, the latency budget only drives the one that runs every frame
+        self.inference_times = {"full_frame": None, "roi": None}
+        self.scaled_workload = "roi" if self.roi_tracking else "full_frame"
+        self.tracking_stats = {"full_frames": 0, "roi_frames": 0, "lost": 0}
+
+    def process_frame(self, frame, timestamp_ms=None):
+        """
+        Detect hands and gestures in one BGR camera frame.
+        Args:
+            frame (np.ndarray): BGR camera frame
+            timestamp_ms (int): Capture time of the frame in ms, defaults to now
+        Returns:
+            np.ndarray: The flipped frame with landmarks and gestures drawn into it
+        """
+        frame = cv2.flip(frame, -1) # Bild drehen
+        # The model gets the only RGB copy, drawing and display stay in BGR
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if timestamp_ms is None:
+            timestamp_ms = int(time.monotonic() * 1000)
+        # Timestamps have to be strictly increasing in VIDEO and LIVE_STREAM mode
+        self.timestamp = max(self.timestamp + 1, timestamp_ms)
+
+        roi = self.tracking_roi(rgb.shape[1], rgb.shape[0])
+        result = self.recognize(rgb, roi)
+        if roi is not None:
+            with self.lock:
+                tracked_hands = len(self.hand_landmarks)
+            if len(result.hand_landmarks) < tracked_hands:
+                # A hand left the box, look at the whole frame again
+                self.tracking_stats["lost"] += 1
+                self.frames_since_detection = 0
+                roi = None
+                result = self.recognize(rgb, roi)
+        if result is not None:
+            self.store_result(result, roi, rgb.shape[1], rgb.shape[0])
+
+        with self.lock:
+            hand_landmarks = self.hand_landmarks
+        for landmarks in hand_landmarks:
+            draw_hand(frame, landmarks)
+        # Also without hands, the gesture state machine counts every frame
+        self.put_gestures(frame)
+
+        self.frame = frame
+        return frame
+
+    def tracking_roi(self, width, height):
+        """Box to run the model on, None for the full frame"""
+        with self.lock:
+            hand_landmarks = self.hand_landmarks
+        if (not self.roi_tracking or not hand_landmarks
+                or self.frames_since_detection >= self.redetect_interval):
+            self.frames_since_detection = 0
+            return None
+        self.frames_since_detection += 1
+        roi = hand_roi(hand_landmarks, width, height, self.roi_padding)
+        if (roi[2] - roi[0]) * (roi[3] - roi[1]) > 0.8 * width * height:
+            # Hardly smaller than the frame, not worth cropping
+            return None
+        return roi
+
+    def recognize(self, rgb, roi=None):
+        """
+        Run the model on the RGB frame or the box roi of it, the budgeted one at the current input scale.
+        Returns:
+            GestureRecognizerResult: None in LIVE_STREAM mode, the result arrives in the callback
+        """
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            rgb = rgb[y0:y1, x0:x1]
+            self.tracking_stats["roi_frames"] += 1
+            workload = "roi"
+        else:
+            self.tracking_stats["full_frames"] += 1
+            workload = "full_frame"
+        if workload == self.scaled_workload and self.input_scale < 1.0:
+            rgb = cv2.resize(rgb, None, fx=self.input_scale, fy=self.input_scale, interpolation=cv2.INTER_AREA)
+        # mp.Image needs contiguous data, a crop is a view into the frame
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(rgb))
+
+        if self.running_mode == mp.tasks.vision.RunningMode.LIVE_STREAM:
+            self.recognizer.recognize_async(image, self.timestamp)
+            return None
+        start_time = time.perf_counter()
+        if roi is not None:
+            result = self.roi_recognizer.recognize(image)
+        else:
+            result = self.recognizer.recognize_for_video(image, self.timestamp)
+        self.update_input_scale(time.perf_counter() - start_time, workload)
+        return result
+
+    def update_input_scale(self, seconds, workload="full_frame"):
+        """
+        Adapt the input scale to the latency budget, with a margin so it does not toggle every frame.
+        Args:
+            seconds (float): Inference time of one model call
+            workload (str): "full_frame" or "roi", only calls of scaled_workload change the scale
+        """
+        self.inference_time = seconds if self.inference_time is None else 0.8 * self.inference_time + 0.2 * seconds
+        previous = self.inference_times[workload]
+        self.inference_times[workload] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+        if self.latency_budget is None or workload != self.scaled_workload:
+            return
+        step = self.scale_step
+        previous = self.step_times.get(step)
+        self.step_times[step] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+        step_time = self.step_times[step]
+        if step_time > self.latency_budget:
+            # Only scale down further while the last step made inference faster. The model resizes
+            # its input itself, below some size a smaller image saves nothing but loses detail
+            larger = self.step_times.get(step - 1)
+            if (larger is None or step_time < 0.95 * larger) and SCALE_STEP ** (step + 1) >= self.min_input_scale:
+                step += 1
+        elif step_time < 0.7 * self.latency_budget and step > 0:
+            step -= 1
+        self.scale_step = step
+        self.input_scale = SCALE_STEP ** step
+
+    def close(self):
+        """Release the models created by start"""
+        self.recognizer.close()
+        if self.roi_recognizer is not None:
+            self.roi_recognizer.close()
 
     def put_gestures(self, frame):
         with self.lock:
@@ -77,41 +566,58 @@ class GestureRecognizer:
                                 0.75, (0,0,255), 2, cv2.LINE_AA)
             y_pos += 40
 
-        # Tool selection
-        tool_selection_result = self.tool_selection(frame)
-        if tool_selection_result:
-            self.gesture_callback(tool_selection_result)
-            self.start_cooldown()
-
-        # Area specification
-        area_specification_result = self.area_specification(frame)
-        if area_specification_result:
-            self.gesture_callback(area_specification_result)
-            self.start_cooldown()
-
-        # Error gesture
-        error_gesture_result = self.error_gesture(frame)
-        if error_gesture_result:
-            self.gesture_callback(error_gesture_result)
-            self.start_cooldown()
-            
+        # Candidate of this frame, confirmed by the state machine over the following frames
+        candidate = self.tool_selection(frame) or self.error_gesture(frame)
+        data = None
+        if candidate is None:
+            data = self.area_specification(frame)
+            if data is not None:
+                candidate = "Area specification"
+
+        event = self.gesture_state.update(candidate, self.timestamp, data)
+        progress = self.gesture_state.progress(self.timestamp)
+        if progress is not None and progress < 1.0:
+            cv2.putText(frame, f"{self.gesture_state.gesture} {progress:.0%}", (10, frame.shape[0] - 20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 0, 0), 2, cv2.LINE_AA)
+        if event is not None:
+            self.report_gesture(*event)
+
+    def report_gesture(self, gesture, data):
+        if gesture == "Area specification":
+            x1, y1, x2, y2 = data
+            print(f"Area confirmed: ({x1}, {y1}), ({x2}, {y2})")
+            self.area_coordinates = data
+            self.gesture_callback(f"Area specification: ({x1}, {y1}), ({x2}, {y2})")
+        else:
+            print(f"{gesture} confirmed")
+            self.gesture_callback(gesture)
+
     def __result_callback(self, result, output_image, timestamp_ms):
+        self.store_result(result)
+
+    def store_result(self, result, roi=None, width=None, height=None):
+        """Keep gestures and landmarks of a result, landmarks found in roi are mapped to the full frame"""
+        hand_landmarks = list(result.hand_landmarks) if result is not None else []
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            hand_landmarks = [[Landmark((x0 + landmark.x * (x1 - x0)) / width, (y0 + landmark.y * (y1 - y0)) / height,
+                                        landmark.z) for landmark in landmarks] for landmarks in hand_landmarks]
         with self.lock: # solves potential concurrency issues
             self.current_gestures = []
+            self.hand_landmarks = []
             if result is not None and any(result.gestures):
                 gestures_tuple = tuple(single_hand_gesture_data[0].category_name for single_hand_gesture_data in result.gestures)
                 self.current_gestures.extend(gestures_tuple)
+                # Same order as the gestures, one list of 21 landmarks per hand
+                self.hand_landmarks = hand_landmarks
 
     def area_specification(self, frame):
-        if self.cooldown_active:
-            print("Cooldown active, skipping area_specification")
-            return None
-
+        """Index finger tips (x1, y1, x2, y2) in pixels if both hands point up, otherwise None"""
         with self.lock:
             if self.current_gestures == ['Pointing_Up', 'Pointing_Up']:
                 if len(self.hand_landmarks) == 2:
-                    index_tip_1 = self.hand_landmarks[0].landmark[mp.solutions.hands.HandLandmark.INDEX_FINGER_TIP]
-                    index_tip_2 = self.hand_landmarks[1].landmark[mp.solutions.hands.HandLandmark.INDEX_FINGER_TIP]
+                    index_tip_1 = self.hand_landmarks[0][INDEX_FINGER_TIP]
+                    index_tip_2 = self.hand_landmarks[1][INDEX_FINGER_TIP]
 
                     x1, y1 = int(index_tip_1.x * frame.shape[1]), int(index_tip_1.y * frame.shape[0])
                     x2, y2 = int(index_tip_2.x * frame.shape[1]), int(index_tip_2.y * frame.shape[0])
@@ -121,68 +627,50 @@ class GestureRecognizer:
                     # Draw the coordinates of the index finger tips
                     cv2.putText(frame, f"({x1}, {y1})", (x1, y1), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv2.LINE_AA)
                     cv2.putText(frame, f"({x2}, {y2})", (x2, y2), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1, cv2.LINE_AA)
-                    # Start a timer to check if the function is activated for 5 seconds
-                    if not self.timer_running:
-                        self.timer_running = True
-                        self.timer = threading.Timer(5.0, self.print_coordinates, args=[x1, y1, x2, y2])
-                        self.timer.start()
-                        print("Timer started")
+                    return (x1, y1, x2, y2)
         return None
 
     def tool_selection(self, frame):
-        if self.cooldown_active:
-            print("Cooldown active, skipping tool_selection")
-            return None
-
         with self.lock:
             sorted_gestures = sorted(self.current_gestures)
             if sorted_gestures == ['Closed_Fist', 'Thumb_Up']:
                 cv2.putText(frame, "Tool Selection: Level 1", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 0, 0), 2, cv2.LINE_AA)
-                print("Gesture 1 recognized: Fine Tool selected")
                 return "Tool Selection: Level 1"
 
             elif sorted_gestures == ['Closed_Fist', 'Victory']:
                 cv2.putText(frame, "Tool Selection: Level 2", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 0, 0), 2, cv2.LINE_AA)
-                print("Gesture 2 recognized: Medium Tool selected")
                 return "Tool Selection: Level 2"
 
             elif sorted_gestures == ['Closed_Fist', 'ILoveYou']:
                 cv2.putText(frame, "Tool Selection: Level 3", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 0, 0), 2, cv2.LINE_AA)
-                print("Gesture 3 recognized: Fine Tool selected")
                 return "Tool Selection: Level 3"
         return None
 
     def error_gesture(self, frame):
-        if self.cooldown_active:
-            print("Cooldown active, skipping error_gesture")
-            return None
-
         with self.lock:
             sorted_gestures = sorted(self.current_gestures)
             if sorted_gestures == ['ILoveYou', 'ILoveYou']:
                 cv2.putText(frame, "Error Gesture", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 0, 0), 2, cv2.LINE_AA)
-                print("Error gesture recognized")
                 return "Error gesture"
         return None
 
-    def print_coordinates(self, x1, y1, x2, y2):
-        print(f"Coordinates after 5 seconds: ({x1}, {y1}), ({x2}, {y2})")
-        self.area_coordinates = (x1, y1, x2, y2)
-        self.timer_running = False
-        self.start_cooldown()
-        self.gesture_callback(f"Area specification: ({x1}, {y1}), ({x2}, {y2})")
-
-    def start_cooldown(self):
-        self.cooldown_active = True
-        threading.Timer(5.0, self.end_cooldown).start()
-
-    def end_cooldown(self):
-        self.cooldown_active = False
-        print("Cooldown ended")
-
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", metavar="PATH", help="Run on a video file or directory of frames instead of the camera")
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate of a directory of frames")
+    parser.add_argument("--roi-tracking", action="store_true", help="Run inference on a box around the hands")
+    parser.add_argument("--latency-budget", type=float, metavar="MS", help="Inference time budget per frame")
+    args = parser.parse_args()
+
     def print_gesture(gesture):
-        print(f"Detected gesture: {gesture}")
+        if args.replay is None:
+            print(f"Detected gesture: {gesture}")
 
+    options = {"roi_tracking": args.roi_tracking}
+    if args.latency_budget is not None:
+        options["latency_budget"] = args.latency_budget / 1000
     rec = GestureRecognizer(print_gesture)
-    rec.main()
\ No newline at end of file
+    if args.replay is not None:
+        rec.replay(args.replay, fps=args.fps, **options)
+    else:
+        rec.main(**options)
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""Queue of grinding jobs, grouped by tool and ordered to minimize travel"""
+
+import numpy as np
+
+
+class GrindingJob:
+    """One rectangular work area and the tool it has to be ground with"""
+
+    def __init__(self, x1, y1, x2, y2, tool):
+        self.x1 = x1
+        self.y1 = y1
+        self.x2 = x2
+        self.y2 = y2
+        self.tool = tool
+
+    @property
+    def center(self):
+        return ((self.x1 + self.x2) / 2, (self.y1 + self.y2) / 2)
+
+    def __repr__(self):
+        return f"GrindingJob(({self.x1:.3f}, {self.y1:.3f}), ({self.x2:.3f}, {self.y2:.3f}), tool={self.tool})"
+
+
+def path_length(points, order, start=None):
+    """Length of the open path visiting points in the given order, optionally starting at start"""
+    ordered = points[order]
+    if start is not None:
+        ordered = np.vstack([start, ordered])
+    return float(np.linalg.norm(np.diff(ordered, axis=0), axis=1).sum())
+
+
+def nearest_neighbour_order(points, start=None):
+    """Visiting order that always travels to the closest unvisited point"""
+    remaining = list(range(len(points)))
+    position = np.asarray(start, dtype=float) if start is not None else points[0]
+    order = []
+    while remaining:
+        distances = np.linalg.norm(points[remaining] - position, axis=1)
+        nearest = remaining.pop(int(np.argmin(distances)))
+        order.append(nearest)
+        position = points[nearest]
+    return order
+
+
+def two_opt(points, order, start=None):
+    """
+    Improve an open visiting order by reversing sub-sequences as long as that shortens the path.
+
+    The first point of the route stays fixed: start if given, otherwise the first point of order.
+    """
+    route = list(order)
+    nodes = np.asarray(points, dtype=float)
+    if start is not None:
+        nodes = np.vstack([nodes, start])
+        route = [len(points)] + route
+    distance = np.linalg.norm(nodes[:, None, :] - nodes[None, :, :], axis=2)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(route) - 1):
+            for j in range(i + 1, len(route)):
+                # Reversing route[i..j] replaces edges (i-1, i) and (j, j+1) with (i-1, j) and (i, j+1)
+                before = distance[route[i - 1], route[i]]
+                after = distance[route[i - 1], route[j]]
+                if j + 1 < len(route):
+                    before += distance[route[j], route[j + 1]]
+                    after += distance[route[i], route[j + 1]]
+                if after < before - 1e-12:
+                    route[i:j + 1] = reversed(route[i:j + 1])
+                    improved = True
+    return route[1:] if start is not None else route
+
+
+class JobQueue:
+    """Collects grinding jobs and plans the order in which they are executed"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def add(self, x1, y1, x2, y2, tool):
+        """Add a work area (world coordinates in m) that has to be ground with tool"""
+        job = GrindingJob(x1, y1, x2, y2, tool)
+        self.jobs.append(job)
+        return job
+
+    def remove(self, job):
+        """Remove a job, e.g. once it is finished"""
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def clear(self):
+        self.jobs = []
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def plan(self, current_tool=None, start=None):
+        """
+        Order the jobs so every tool is only picked up once and travel between areas is short.
+
+        Jobs for the tool that is already mounted come first, the other tools follow in rack order.
+        Within a tool the areas are ordered by nearest neighbour and improved with 2-opt.
+        Args:
+            current_tool (int): Tool that is mounted right now
+            start (tuple): (x, y) every tool group starts from, the approach waypoint above the work area
+        Returns:
+            list: GrindingJob in execution order
+        """
+        # Jobs without tool (None) go last, None is never compared with a tool number
+        tools = sorted({job.tool for job in self.jobs},
+                       key=lambda tool: (tool != current_tool, tool is None, tool or 0))
+        planned = []
+        for tool in tools:
+            group = [job for job in self.jobs if job.tool == tool]
+            centers = np.array([job.center for job in group], dtype=float)
+            order = nearest_neighbour_order(centers, start)
+            order = two_opt(centers, order, start)
+            planned.extend(group[i] for i in order)
+        return planned
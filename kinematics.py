@@ -0,0 +1,145 @@
+"""
+UR3e forward and inverse kinematics of the flange for offline planning.
+
+All poses here are flange poses. They are the TCP poses of the controller only while the TCP of
+the robot installation has no offset, TCP poses of a tool with an offset must not be passed in.
+"""
+
+import functools
+import math
+
+import numpy as np
+
+# UR3e Denavit-Hartenberg parameters
+UR3E_D = (0.15185, 0.0, 0.0, 0.13105, 0.08535, 0.0921)
+UR3E_A = (0.0, -0.24355, -0.2132, 0.0, 0.0, 0.0)
+UR3E_ALPHA = (math.pi / 2, 0.0, 0.0, math.pi / 2, -math.pi / 2, 0.0)
+
+
+def rotvec_to_matrix(rotvec):
+    """Convert a UR rotation vector (rx, ry, rz) into a rotation matrix"""
+    rotvec = np.asarray(rotvec, dtype=float)
+    angle = np.linalg.norm(rotvec)
+    if angle < 1e-12:
+        return np.eye(3)
+    kx, ky, kz = rotvec / angle
+    k = np.array([[0, -kz, ky], [kz, 0, -kx], [-ky, kx, 0]])
+    return np.eye(3) + math.sin(angle) * k + (1 - math.cos(angle)) * (k @ k)
+
+
+def matrix_to_rotvec(matrix):
+    """Convert a rotation matrix into a UR rotation vector (rx, ry, rz)"""
+    cos_angle = max(-1.0, min(1.0, (np.trace(matrix) - 1) / 2))
+    angle = math.acos(cos_angle)
+    if angle < 1e-12:
+        return np.zeros(3)
+    if math.pi - angle < 1e-6:
+        # Near 180 degrees the axis is the dominant column of (R + I) / 2 = k k^T
+        outer = (matrix + np.eye(3)) / 2
+        i = int(np.argmax(np.diag(outer)))
+        axis = outer[:, i] / math.sqrt(outer[i, i])
+        return axis * angle
+    axis = np.array([matrix[2, 1] - matrix[1, 2], matrix[0, 2] - matrix[2, 0], matrix[1, 0] - matrix[0, 1]])
+    return axis / (2 * math.sin(angle)) * angle
+
+
+def pose_to_matrix(pose):
+    """Convert a UR pose (x, y, z, rx, ry, rz) into a homogeneous transform"""
+    transform = np.eye(4)
+    transform[:3, :3] = rotvec_to_matrix(pose[3:6])
+    transform[:3, 3] = pose[:3]
+    return transform
+
+
+def matrix_to_pose(transform):
+    """Convert a homogeneous transform into a UR pose (x, y, z, rx, ry, rz)"""
+    return tuple(float(value) for value in (*transform[:3, 3], *matrix_to_rotvec(transform[:3, :3])))
+
+
+def forward_kinematics(joints):
+    """
+    Flange transform of the UR3e for the given joint angles.
+    Args:
+        joints (tuple): Six joint angles in radians
+    Returns:
+        np.ndarray: 4x4 homogeneous transform of the flange in the base frame
+    """
+    transform = np.eye(4)
+    for theta, d, a, alpha in zip(joints, UR3E_D, UR3E_A, UR3E_ALPHA):
+        ct, st = math.cos(theta), math.sin(theta)
+        ca, sa = math.cos(alpha), math.sin(alpha)
+        transform = transform @ np.array([
+            [ct, -st * ca, st * sa, a * ct],
+            [st, ct * ca, -ct * sa, a * st],
+            [0.0, sa, ca, d],
+            [0.0, 0.0, 0.0, 1.0],
+        ])
+    return transform
+
+
+def forward_kinematics_pose(joints):
+    """Flange pose (x, y, z, rx, ry, rz) of the UR3e for the given joint angles"""
+    return matrix_to_pose(forward_kinematics(joints))
+
+
+def _pose_error(current, target):
+    """Six dimensional position and orientation error between two transforms"""
+    position_error = target[:3, 3] - current[:3, 3]
+    rotation_error = matrix_to_rotvec(target[:3, :3] @ current[:3, :3].T)
+    return np.concatenate([position_error, rotation_error])
+
+
+def inverse_kinematics(pose, reference_joints, tolerance=1e-6, max_iterations=100):
+    """
+    Joint angles that reach a flange pose, found by damped least squares starting at reference_joints.
+
+    The solution is the configuration closest to the reference, which is the one the
+    controller picks for a movej to a pose from that configuration.
+    Args:
+        pose (tuple): Target flange pose (x, y, z, rx, ry, rz)
+        reference_joints (tuple): Joint angles to start the search from
+        tolerance (float): Accepted pose error
+        max_iterations (int): Iteration limit
+    Returns:
+        tuple: Six joint angles in radians
+    """
+    target = pose_to_matrix(pose)
+    joints = np.array(reference_joints, dtype=float)
+    damping = 1e-3
+    step = 1e-6
+    for _ in range(max_iterations):
+        current = forward_kinematics(joints)
+        error = _pose_error(current, target)
+        if np.linalg.norm(error) < tolerance:
+            return tuple(float(value) for value in joints)
+        jacobian = np.empty((6, 6))
+        for i in range(6):
+            shifted = joints.copy()
+            shifted[i] += step
+            jacobian[:, i] = _pose_error(current, forward_kinematics(shifted)) / step
+        joints = joints + jacobian.T @ np.linalg.solve(jacobian @ jacobian.T + damping * np.eye(6), error)
+    raise ValueError(f"Inverse kinematics did not converge for pose {tuple(pose)}")
+
+
+@functools.lru_cache(maxsize=512)
+def _cached_inverse_kinematics(pose_key, reference_key, resolution):
+    pose = tuple(value * resolution for value in pose_key)
+    reference_joints = tuple(value * 1e-3 for value in reference_key)
+    return inverse_kinematics(pose, reference_joints)
+
+
+def cached_inverse_kinematics(pose, reference_joints, resolution=1e-6):
+    """
+    inverse_kinematics with an LRU cache for waypoints that are solved again and again.
+
+    The pose is rounded to resolution (m and rad) and the reference joints to 1 mrad before lookup,
+    a reference that close always converges to the same configuration.
+    """
+    pose_key = tuple(int(round(value / resolution)) for value in pose[:6])
+    reference_key = tuple(int(round(value / 1e-3)) for value in reference_joints)
+    return _cached_inverse_kinematics(pose_key, reference_key, resolution)
+
+
+def inverse_kinematics_cache_info():
+    """Hit/miss statistics of cached_inverse_kinematics"""
+    return _cached_inverse_kinematics.cache_info()
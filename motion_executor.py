@@ -0,0 +1,135 @@
+"""Single worker thread that executes all robot motions in submission order"""
+
+import functools
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class MotionCancelled(Exception):
+    """Raised by motion commands that were stopped by a cancel request"""
+
+    def __init__(self, message="Motion cancelled", progress=None):
+        super().__init__(message)
+        self.progress = progress
+
+
+class CancelToken:
+    """Flag that is set from any thread and polled by the running motion"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def reset(self):
+        self._event.clear()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise MotionCancelled()
+
+
+class MotionExecutor:
+    """
+    Runs motion commands one after another on one dedicated thread.
+
+    Commands are queued in submission order, so two motions are never sent to the robot
+    connection at the same time. submit returns a Future that resolves with the result.
+    """
+
+    def __init__(self, name="motion-worker"):
+        self._commands = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._shutdown = False
+        self._worker.start()
+
+    def submit(self, function, *args, **kwargs):
+        """Queue a command and return a Future of its result"""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Motion executor is shut down")
+            future = Future()
+            self._commands.put((future, function, args, kwargs))
+        return future
+
+    def preempt(self, function, *args, **kwargs):
+        """
+        Cancel all queued commands and queue function in their place.
+
+        The running command is not interrupted here, that is up to the caller.
+        Returns:
+            tuple: (Future of function, number of cancelled commands)
+        """
+        with self._lock:
+            cancelled = 0
+            while True:
+                try:
+                    command = self._commands.get_nowait()
+                except queue.Empty:
+                    break
+                if command is None:
+                    # Keep a shutdown request
+                    self._commands.put(None)
+                    break
+                if command[0].cancel():
+                    cancelled += 1
+            future = Future()
+            self._commands.put((future, function, args, kwargs))
+        return future, cancelled
+
+    def in_worker(self):
+        """True if called from the motion worker thread"""
+        return threading.current_thread() is self._worker
+
+    def pending(self):
+        """Number of commands waiting to be executed"""
+        return self._commands.qsize()
+
+    def shutdown(self, wait=True):
+        """Stop accepting commands, the worker exits after the queued ones"""
+        with self._lock:
+            self._shutdown = True
+            self._commands.put(None)
+        if wait and not self.in_worker():
+            self._worker.join()
+
+    def _run(self):
+        while True:
+            command = self._commands.get()
+            if command is None:
+                return
+            future, function, args, kwargs = command
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args, **kwargs))
+            except MotionCancelled as e:
+                print(str(e))
+                future.set_exception(e)
+            except Exception as e:
+                print(f"Error during robot movement: {str(e)}")
+                future.set_exception(e)
+
+
+def motion_command(method):
+    """
+    Decorator for RobotMovements methods that move the robot.
+
+    Called from outside the motion worker the method is queued on self.executor and a Future is
+    returned. Called from the worker itself (a motion composed of other motions) it runs directly,
+    unless self.cancel_token is set, then MotionCancelled is raised instead.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.executor.in_worker():
+            self.cancel_token.raise_if_cancelled()
+            return method(self, *args, **kwargs)
+        return self.executor.submit(method, self, *args, **kwargs)
+    return wrapper
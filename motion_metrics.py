@@ -0,0 +1,206 @@
+"""Timing of every robot motion, split into phases and kept in streaming histograms"""
+
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+
+# Upper bucket bounds in seconds, from command round trips up to long raster moves
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class StreamingHistogram:
+    """Fixed-bucket histogram that keeps count, sum, min and max without storing samples"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimated quantile, interpolated linearly inside the bucket it falls into"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                lower = max(lower, self.min)
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max if self.count else None,
+        }
+
+
+class MotionTimer:
+    """Times the phases of one motion call, see MotionMetrics.timer"""
+
+    def __init__(self, metrics, motion):
+        self.metrics = metrics
+        self.motion = motion
+        self.caller = metrics.caller()
+        self.start = self.last = time.perf_counter()
+
+    def phase(self, name):
+        """Record the time since the previous phase (or the start) as phase name"""
+        now = time.perf_counter()
+        self.metrics.observe(self.caller, self.motion, name, now - self.last)
+        self.last = now
+
+    def done(self):
+        """Record the wall time of the whole call"""
+        self.metrics.observe(self.caller, self.motion, "total", time.perf_counter() - self.start)
+
+    def failed(self):
+        self.metrics.count_error(self.caller, self.motion)
+
+
+class MotionMetrics:
+    """
+    Phase timings of all motions, by caller, motion type and phase.
+
+    Motions record their phases through timer. The caller is the innermost tag set with timed_as,
+    e.g. "get_tool" or "homing". Metrics are read with snapshot or exported in the Prometheus
+    text format with write_prometheus.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.histograms = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self._tags = threading.local()
+
+    def caller(self):
+        tags = getattr(self._tags, "stack", None)
+        return tags[-1] if tags else "other"
+
+    def push_tag(self, tag):
+        if not hasattr(self._tags, "stack"):
+            self._tags.stack = []
+        self._tags.stack.append(tag)
+
+    def pop_tag(self):
+        self._tags.stack.pop()
+        return len(self._tags.stack)
+
+    def timer(self, motion):
+        """Start timing a motion of type motion (e.g. "movel") for the current caller"""
+        return MotionTimer(self, motion)
+
+    def observe(self, caller, motion, phase, seconds):
+        key = (caller, motion, phase)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = StreamingHistogram(self.buckets)
+            histogram.observe(seconds)
+
+    def count_error(self, caller, motion):
+        with self._lock:
+            self.errors[(caller, motion)] = self.errors.get((caller, motion), 0) + 1
+
+    def snapshot(self):
+        """
+        Current metrics as plain values.
+        Returns:
+            dict: {caller: {motion: {phase: summary}}} with count, sum, mean, min, p50, p95, p99
+                and max in seconds, errors per (caller, motion) under "errors"
+        """
+        with self._lock:
+            result = {}
+            for (caller, motion, phase), histogram in sorted(self.histograms.items()):
+                result.setdefault(caller, {}).setdefault(motion, {})[phase] = histogram.summary()
+            result["errors"] = {f"{caller}/{motion}": count for (caller, motion), count in sorted(self.errors.items())}
+            return result
+
+    def print_summary(self):
+        snapshot = self.snapshot()
+        errors = snapshot.pop("errors")
+        for caller, motions in snapshot.items():
+            for motion, phases in motions.items():
+                total = phases.get("total")
+                parts = ", ".join(f"{phase} {summary['mean'] * 1000:.1f} ms" for phase, summary in phases.items()
+                                  if phase != "total")
+                if total:
+                    print(f"{caller:>12} {motion:<12} n={total['count']:<5} mean {total['mean'] * 1000:.1f} ms "
+                          f"p95 {total['p95'] * 1000:.1f} ms ({parts})")
+        for name, count in errors.items():
+            print(f"Errors {name}: {count}")
+
+    def prometheus_text(self, prefix="robot_motion"):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [f"# HELP {prefix}_phase_seconds Wall time of robot motion phases",
+                 f"# TYPE {prefix}_phase_seconds histogram"]
+        with self._lock:
+            for (caller, motion, phase), histogram in sorted(self.histograms.items()):
+                labels = f'caller="{caller}",motion="{motion}",phase="{phase}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{prefix}_phase_seconds_count{{{labels}}} {histogram.count}")
+            lines.append(f"# HELP {prefix}_errors_total Failed robot motions")
+            lines.append(f"# TYPE {prefix}_errors_total counter")
+            for (caller, motion), count in sorted(self.errors.items()):
+                lines.append(f'{prefix}_errors_total{{caller="{caller}",motion="{motion}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write prometheus_text to path, replaced atomically for the node exporter textfile collector"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.prometheus_text())
+        os.replace(temporary, path)
+
+
+def timed_as(caller):
+    """
+    Decorator for RobotMovements methods: motions inside the method are recorded with this caller tag.
+
+    When the outermost tagged method returns, the metrics file is rewritten if one is configured.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            self.metrics.push_tag(caller)
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                if self.metrics.pop_tag() == 0 and self.metrics_file is not None:
+                    try:
+                        self.metrics.write_prometheus(self.metrics_file)
+                    except OSError as e:
+                        print(f"Error writing metrics: {str(e)}")
+        return wrapper
+    return decorator
@@ -0,0 +1,345 @@
+"""Robot backends used by RobotMovements: the real UR controller or an in-process simulation"""
+
+import math
+import threading
+import time
+
+from cycle_time import CycleTimeEstimator, trapezoidal_time
+from kinematics import cached_inverse_kinematics, forward_kinematics_pose
+
+
+class RobotBackend:
+    """Interface of the robot connection used by RobotMovements"""
+
+    # Hz at which the controller publishes its state over RTDE, 500 on e-Series like the UR3e, 125 on CB3
+    state_rate = 500
+
+    def reset_error(self):
+        raise NotImplementedError
+
+    def movej(self, q, a, v, wait=True):
+        """Move to joint angles q"""
+        raise NotImplementedError
+
+    def movej_pose(self, pose, a, v, wait=True):
+        """Move in joint space to the configuration that reaches TCP pose, solved by the controller"""
+        raise NotImplementedError
+
+    def movel(self, pose, a, v, wait=True):
+        """Move the TCP linearly to pose"""
+        raise NotImplementedError
+
+    def movel_path(self, poses, a, v, radii, wait=True):
+        """Move the TCP through all poses as one blended motion, radii holds one blend radius per pose"""
+        raise NotImplementedError
+
+    def wait_idle(self):
+        """Wait until the robot has finished or stopped the running motion"""
+        raise NotImplementedError
+
+    def stopl(self, a):
+        """Decelerate the TCP to a stop"""
+        raise NotImplementedError
+
+    def init_realtime_control(self):
+        """Start the program on the controller that follows realtime setpoints"""
+        raise NotImplementedError
+
+    def set_realtime_pose(self, pose):
+        """Send the next TCP setpoint to the realtime program, returns without waiting"""
+        raise NotImplementedError
+
+    def get_actual_tcp_pose(self):
+        raise NotImplementedError
+
+    def get_actual_joint_positions(self):
+        raise NotImplementedError
+
+    def read_state(self):
+        """Latest (tcp_pose, joint_positions, tcp_speed) without waiting for the controller"""
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class URBasicBackend(RobotBackend):
+    """Connection to a real UR controller through URBasic"""
+
+    def __init__(self, robot_ip):
+        # Imported here so the simulation runs without URBasic installed
+        import URBasic
+
+        self.robotModel = URBasic.robotModel.RobotModel()
+        # Set the IP address in the robot model
+        self.robotModel.ipAddress = robot_ip
+        self.robot = URBasic.urScriptExt.UrScriptExt(
+            host=robot_ip,
+            robotModel=self.robotModel
+        )
+
+    def reset_error(self):
+        return self.robot.reset_error()
+
+    def movej(self, q, a, v, wait=True):
+        return self.robot.movej(q=q, a=a, v=v, wait=wait)
+
+    def movej_pose(self, pose, a, v, wait=True):
+        # movej with a pose target lets the controller solve the IK with its calibrated kinematics
+        return self.robot.movej(pose=pose, a=a, v=v, wait=wait)
+
+    def movel(self, pose, a, v, wait=True):
+        return self.robot.movel(pose=pose, a=a, v=v, wait=wait)
+
+    def movel_path(self, poses, a, v, radii, wait=True):
+        # One program with a movel per corner, the controller blends between them without stopping
+        program = "def blended_path():\n"
+        for pose, radius in zip(poses, radii):
+            pose_str = ", ".join(f"{value:.5f}" for value in pose)
+            program += f"  movel(p[{pose_str}], a={a}, v={v}, r={radius:.5f})\n"
+        program += f"  stopl({a})\n"
+        program += "end\n"
+        self.robot.robotConnector.RealTimeClient.SendProgram(program)
+        if wait:
+            self.robot.waitRobotIdleOrStopFlag()
+
+    def wait_idle(self):
+        self.robot.waitRobotIdleOrStopFlag()
+
+    def stopl(self, a):
+        return self.robot.stopl(a=a)
+
+    def init_realtime_control(self):
+        return self.robot.init_realtime_control()
+
+    def set_realtime_pose(self, pose):
+        return self.robot.set_realtime_pose(pose)
+
+    def get_actual_tcp_pose(self):
+        return self.robot.get_actual_tcp_pose()
+
+    def get_actual_joint_positions(self):
+        return self.robot.get_actual_joint_positions()
+
+    def read_state(self):
+        # Values of the last RTDE package, reading them does not send anything to the controller
+        return (self.robotModel.ActualTCPPose(), self.robotModel.ActualQ(), self.robotModel.ActualTCPSpeed())
+
+    def close(self):
+        return self.robot.close()
+
+
+class SimulatedRobot(RobotBackend):
+    """
+    In-process UR3e simulation for running and benchmarking without hardware.
+
+    Motions take the time predicted by the trapezoidal timing model of CycleTimeEstimator,
+    scaled by time_scale (0 completes motions instantly). Every command additionally
+    waits command_latency seconds to model the network round trip to the controller.
+    stopl from another thread interrupts a running motion, the robot is left at the point
+    it had reached by then (linear in time along the motion).
+    """
+
+    HOME_JOINTS = (math.radians(-180), math.radians(3), math.radians(-142),
+                   math.radians(-42), math.radians(90), math.radians(0))
+
+    def __init__(self, command_latency=0.0, time_scale=1.0, start_joints=HOME_JOINTS):
+        self.command_latency = command_latency
+        self.time_scale = time_scale
+        self.lock = threading.Lock()
+        self._joints = tuple(start_joints)
+        self._last_joints = self._joints
+        self._pose = forward_kinematics_pose(self._joints)
+        self._busy_until = 0.0
+        self._stop = threading.Event()
+        self._motion = None  # (waypoints, joint_space, start_time, end_time, duration) of the last motion
+        self.realtime_control = False
+        self.closed = False
+        self.command_counts = {}
+        self.simulated_motion_time = 0.0
+
+    def _command(self, name):
+        """Count a command and wait for the command latency"""
+        if self.closed:
+            raise RuntimeError("Simulated robot connection is closed")
+        self.command_counts[name] = self.command_counts.get(name, 0) + 1
+        if self.command_latency > 0:
+            time.sleep(self.command_latency)
+
+    def _run_motion(self, duration, waypoints, joint_space=False):
+        """
+        Start a motion of the given duration, called with the lock held and the target already set.
+
+        waypoints are the poses (or joint angles if joint_space) the motion passes from its start,
+        they give the position the robot stops at if the motion is interrupted by stopl.
+        """
+        self._stop.clear()
+        start_time = time.perf_counter()
+        self.simulated_motion_time += duration
+        self._busy_until = start_time + duration * self.time_scale
+        self._motion = (waypoints, joint_space, start_time, self._busy_until, duration)
+
+    @staticmethod
+    def _interpolate(waypoints, fraction, joint_space):
+        """Point at fraction of the length of a polyline through waypoints"""
+        points = [tuple(float(value) for value in point) for point in waypoints]
+        if joint_space:
+            lengths = [max(abs(b - a) for a, b in zip(start, end)) for start, end in zip(points[:-1], points[1:])]
+        else:
+            lengths = [math.dist(start[:3], end[:3]) for start, end in zip(points[:-1], points[1:])]
+        remaining = fraction * sum(lengths)
+        for start, end, length in zip(points[:-1], points[1:], lengths):
+            if remaining <= length and length > 0:
+                t = remaining / length
+                return tuple(a + t * (b - a) for a, b in zip(start, end))
+            remaining -= length
+        return points[-1]
+
+    def wait_idle(self):
+        """Wait until the current motion has finished or was stopped"""
+        remaining = self._busy_until - time.perf_counter()
+        if remaining > 0:
+            self._stop.wait(remaining)
+
+    def _joints_for_pose(self):
+        if self._joints is None:
+            self._joints = cached_inverse_kinematics(self._pose, self._last_joints)
+        return self._joints
+
+    def reset_error(self):
+        self._command("reset_error")
+
+    def movej(self, q, a, v, wait=True):
+        self._command("movej")
+        self.realtime_control = False  # A motion program replaces the realtime program
+        self.wait_idle()
+        with self.lock:
+            start = self._joints_for_pose()
+            duration, _ = CycleTimeEstimator(a, v).movej_time(start, q)
+            self._joints = tuple(float(value) for value in q)
+            self._pose = forward_kinematics_pose(self._joints)
+            self._run_motion(duration, [start, self._joints], joint_space=True)
+        if wait:
+            self.wait_idle()
+
+    def movej_pose(self, pose, a, v, wait=True):
+        self._command("movej_pose")
+        self.realtime_control = False
+        self.wait_idle()
+        with self.lock:
+            start = self._joints_for_pose()
+            target = cached_inverse_kinematics(pose, start)
+            duration, _ = CycleTimeEstimator(a, v).movej_time(start, target)
+            self._joints = target
+            self._pose = tuple(float(value) for value in pose)
+            self._run_motion(duration, [start, target], joint_space=True)
+        if wait:
+            self.wait_idle()
+
+    def movel(self, pose, a, v, wait=True):
+        self._command("movel")
+        self.realtime_control = False
+        self.wait_idle()
+        with self.lock:
+            start = self._pose
+            duration, _ = CycleTimeEstimator(a, v).movel_time(start, pose)
+            self._set_pose(pose)
+            self._run_motion(duration, [start, pose])
+        if wait:
+            self.wait_idle()
+
+    def movel_path(self, poses, a, v, radii, wait=True):
+        self._command("movel_path")
+        self.realtime_control = False
+        self.wait_idle()
+        with self.lock:
+            # Blends are assumed to keep the tool speed, so the path behaves like one long move
+            waypoints = [self._pose] + list(poses)
+            length = sum(math.dist(start[:3], end[:3]) for start, end in zip(waypoints[:-1], waypoints[1:]))
+            duration = trapezoidal_time(length, v, a)
+            self._set_pose(poses[-1])
+            self._run_motion(duration, waypoints)
+        if wait:
+            self.wait_idle()
+
+    def _set_pose(self, pose):
+        if self._joints is not None:
+            self._last_joints = self._joints
+        self._joints = None
+        self._pose = tuple(float(value) for value in pose)
+
+    def stopl(self, a):
+        self._command("stopl")
+        with self.lock:
+            now = time.perf_counter()
+            if self._motion is None or now >= self._busy_until:
+                return
+            # Leave the robot where the running motion has got to and wake up waiting callers
+            waypoints, joint_space, start_time, end_time, duration = self._motion
+            fraction = (now - start_time) / (end_time - start_time)
+            self.simulated_motion_time -= duration * (1.0 - fraction)
+            stopped_at = self._interpolate(waypoints, fraction, joint_space)
+            if joint_space:
+                self._joints = stopped_at
+                self._pose = forward_kinematics_pose(stopped_at)
+            else:
+                self._set_pose(stopped_at)
+            self._busy_until = now
+            self._motion = None
+            self._stop.set()
+
+    def init_realtime_control(self):
+        self._command("init_realtime_control")
+        self.realtime_control = True
+
+    def set_realtime_pose(self, pose):
+        # Setpoints are one-way register writes, they do not wait for the command latency
+        if self.closed:
+            raise RuntimeError("Simulated robot connection is closed")
+        if not self.realtime_control:
+            raise RuntimeError("Realtime control is not running")
+        self.command_counts["set_realtime_pose"] = self.command_counts.get("set_realtime_pose", 0) + 1
+        with self.lock:
+            now = time.perf_counter()
+            self._motion = ([self._pose, pose], False, now - 1.0 / 125, now, 1.0 / 125)
+            self._set_pose(pose)
+
+    def get_actual_tcp_pose(self):
+        return list(self._pose)
+
+    def get_actual_joint_positions(self):
+        with self.lock:
+            return list(self._joints_for_pose())
+
+    def read_state(self):
+        """
+        Interpolated state during a motion. Joint positions are only tracked through joint space
+        motions, during linear motions the joints of the last known configuration are reported.
+        """
+        motion = self._motion
+        joints = self._joints if self._joints is not None else self._last_joints
+        if motion is None:
+            return list(self._pose), list(joints), [0.0] * 6
+        waypoints, joint_space, start_time, end_time, _ = motion
+        now = time.perf_counter()
+        if now >= end_time or end_time <= start_time:
+            return list(self._pose), list(joints), [0.0] * 6
+
+        def position(t):
+            fraction = min(max((t - start_time) / (end_time - start_time), 0.0), 1.0)
+            return self._interpolate(waypoints, fraction, joint_space)
+
+        dt = 1e-3 * (end_time - start_time)
+        current = position(now)
+        previous = position(now - dt)
+        if joint_space:
+            joints = current
+            pose = forward_kinematics_pose(current)
+            speed = [(a - b) / dt for a, b in zip(pose[:3], forward_kinematics_pose(previous)[:3])] + [0.0] * 3
+        else:
+            pose = current
+            speed = [(a - b) / dt for a, b in zip(current, previous)]
+        return list(pose), list(joints), speed
+
+    def close(self):
+        self.closed = True
@@ -1,13 +1,19 @@
-import URBasic
+import argparse
 import math
 import time
-import threading
 from robot_movements import RobotMovements
 from gesture_control import GestureRecognizer
 from robotiq_gripper import RobotiqGripper
+from robot_backend import SimulatedRobot
 
 class RobotGestureController:
-    def __init__(self):
+    TOOL_GESTURES = {
+        "Tool Selection: Level 1": 1,
+        "Tool Selection: Level 2": 2,
+        "Tool Selection: Level 3": 3,
+    }
+
+    def __init__(self, backend=None, telemetry_dir=None, metrics_file=None, recognizer_options=None):
         
         """Base Initialization"""
         self.robot_ip = '172.17.0.2'
@@ -26,10 +32,15 @@ class RobotGestureController:
             robot_ip=self.robot_ip,
             # gripper=self.gripper,
             acceleration=0.7,
-            velocity=0.7
+            velocity=0.7,
+            backend=backend,
+            lazy=True,
+            telemetry_dir=telemetry_dir,
+            metrics_file=metrics_file
         )
         self.current_position = "start"
-        self.timer_running = False
+        self.recognizer_options = recognizer_options or {}
+        self.trajectory = None
         self.current_tool = None
 
     def handle_gesture(self, gesture):
@@ -40,89 +51,40 @@ class RobotGestureController:
                 if ":" in gesture:
                     coordinates = gesture.split(":")[1].strip()
                     x1, y1, x2, y2 = map(int, coordinates.replace('(', '').replace(')', '').replace(',', '').split())
-                    if not self.timer_running:
-                        self.timer_running = True
-                        threading.Timer(5.0, self.start_trajectory, args=(x1, y1, x2, y2)).start()
-                        print("Timer started")
+                    # The recognizer only reports an area after it was held, see GestureStateMachine
+                    self.start_trajectory(x1, y1, x2, y2)
                 
-            elif gesture == "Tool Selection: Level 1":
+            elif gesture in self.TOOL_GESTURES:
                 print("Performing get tool movement...")
-                """Drop current tool and get new tool"""
-                if self.current_tool is not None:
-                    drop_thread = threading.Thread(target=self.robot.drop_tool, args=(self.current_tool,))
-                    drop_thread.start()
-                    drop_thread.join()  # Wait for drop to complete
-                    self.current_position = "drop_tool"
-                    self.current_tool = None
-                
-                tool_choice = 1  # Beispiel: Werkzeug 1 auswählen
-                get_thread = threading.Thread(target=self.robot.get_tool, args=(tool_choice, 0.1))
-                get_thread.start()
-                get_thread.join()  # Wait for get tool to complete
+                """Drop current tool and get new tool in one pass through the rack"""
+                tool_choice = self.TOOL_GESTURES[gesture]
+                # Motions are queued on the robot's motion worker and run in order,
+                # so the wait pose follows the tool change without blocking the camera loop
+                self.robot.swap_tool(self.current_tool, tool_choice)
                 self.current_position = "get_tool"
                 self.current_tool = tool_choice
+                self.robot.move_to_wait_for_input_pose()
                 
-                # Move to wait position in a new thread after tool operations complete
-                wait_thread = threading.Thread(target=self.robot.move_to_wait_for_input_pose)
-                wait_thread.start()
-
-            elif gesture == "Tool Selection: Level 2":
-                print("Performing get tool movement...")
-                """Drop current tool and get new tool"""
-                if self.current_tool is not None:
-                    drop_thread = threading.Thread(target=self.robot.drop_tool, args=(self.current_tool,))
-                    drop_thread.start()
-                    drop_thread.join()  # Wait for drop to complete
-                    self.current_position = "drop_tool"
-                    self.current_tool = None
-                
-                tool_choice = 2  # Beispiel: Werkzeug 2 auswählen
-                get_thread = threading.Thread(target=self.robot.get_tool, args=(tool_choice, 0.1))
-                get_thread.start()
-                get_thread.join()  # Wait for get tool to complete
-                self.current_position = "get_tool"
-                self.current_tool = tool_choice
-                
-                # Move to wait position in a new thread after tool operations complete
-                wait_thread = threading.Thread(target=self.robot.move_to_wait_for_input_pose)
-                wait_thread.start()
-
-            elif gesture == "Tool Selection: Level 3":
-                print("Performing get tool movement...")
-                """Drop current tool and get new tool"""
-                if self.current_tool is not None:
-                    drop_thread = threading.Thread(target=self.robot.drop_tool, args=(self.current_tool,))
-                    drop_thread.start()
-                    drop_thread.join()  # Wait for drop to complete
-                    self.current_position = "drop_tool"
-                    self.current_tool = None
-                
-                tool_choice = 3  # Beispiel: Werkzeug 3 auswählen
-                get_thread = threading.Thread(target=self.robot.get_tool, args=(tool_choice, 0.1))
-                get_thread.start()
-                get_thread.join()  # Wait for get tool to complete
-                self.current_position = "get_tool"
-                self.current_tool = tool_choice
-                
-                # Move to wait position in a new thread after tool operations complete
-                wait_thread = threading.Thread(target=self.robot.move_to_wait_for_input_pose)
-                wait_thread.start()
-                
-            # elif gesture == "Error gesture":
-            #     print("Performing redo movement...")
-            #     threading.Thread(target=self.robot.perform_redo_movement).start()
-            #     self.current_position = "redo_movement"
+            elif gesture == "Error gesture":
+                if self.trajectory_running():
+                    print("Stopping trajectory...")
+                    self.robot.cancel_motion()
+                    self.current_position = "cancelled"
+                # else:
+                #     print("Performing redo movement...")
+                #     self.robot.perform_redo_movement()
+                #     self.current_position = "redo_movement"
                 
         except Exception as e:
             print(f"Error during robot movement: {str(e)}")
 
     def start_trajectory(self, x1, y1, x2, y2):
-        """Start trajectory generation after 5 seconds"""
+        """Convert the area to world coordinates and grind it"""
         top_left = (min(x1, x2), min(y1, y2))
         top_right = (max(x1, x2), min(y1, y2))
         bottom_left = (min(x1, x2), max(y1, y2))
         bottom_right = (max(x1, x2), max(y1, y2))
-        print(f"Pixel Coordinates after 5 seconds: top_left: ({top_left}), top_right: ({top_right}), bottom_left: ({bottom_left}), bottom_right: ({bottom_right})")
+        print(f"Pixel Coordinates: top_left: ({top_left}), top_right: ({top_right}), bottom_left: ({bottom_left}), bottom_right: ({bottom_right})")
         print(f"Selected Coordinates for Start point: bottom_left: ({bottom_left[0]}, {bottom_left[1]})")
         print(f"Selected Coordinates for End point: top_right: ({top_right[0]}, {top_right[1]})")
         print("-------------------")
@@ -130,8 +92,14 @@ class RobotGestureController:
         world_x2, world_y2 = self.robot.pixel_to_world(top_right[0], top_right[1])
         print(f"World coordinates Start Point: ({world_x1}, {world_y1})")
         print(f"World coordinates End Point: ({world_x2}, {world_y2})")
-        threading.Thread(target=self.robot.perform_trajectory, args=(world_x1, world_y1, world_x2, world_y2)).start()
-        self.timer_running = False
+        if self.trajectory_running():
+            # A new area replaces a wrong one instead of queueing a second trajectory behind it
+            print("Stopping current trajectory for the new area")
+            self.robot.cancel_motion()
+        self.trajectory = self.robot.perform_trajectory(world_x1, world_y1, world_x2, world_y2)
+
+    def trajectory_running(self):
+        return self.trajectory is not None and not self.trajectory.done()
 
     def run(self):
         """Main run loop"""
@@ -140,18 +108,34 @@ class RobotGestureController:
             print("Press ESC to quit\n")
             
             recognizer = GestureRecognizer(self.handle_gesture)
-            recognizer.main()
+            recognizer.main(**self.recognizer_options)
                 
         except KeyboardInterrupt:
             print("\nClosing robot connection...")
         except Exception as e:
             print(f"\nError occurred: {str(e)}")
         finally:
-            self.robot.robot.close()
+            self.robot.close()
             print("Robot connection closed")
 
 def main():
-    controller = RobotGestureController()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--simulate", action="store_true", help="Use the simulated robot instead of the UR3e")
+    parser.add_argument("--latency", type=float, default=0.0, help="Command latency of the simulated robot in seconds")
+    parser.add_argument("--telemetry", metavar="DIR", help="Record the robot state of every job into DIR")
+    parser.add_argument("--metrics", metavar="FILE", help="Export motion timing histograms to FILE (Prometheus text format)")
+    parser.add_argument("--roi-tracking", action="store_true",
+                        help="Run gesture inference only on a box around the hands of the previous frame")
+    parser.add_argument("--latency-budget", type=float, metavar="MS",
+                        help="Scale the gesture inference input down to stay within MS milliseconds per frame")
+    args = parser.parse_args()
+
+    backend = SimulatedRobot(command_latency=args.latency) if args.simulate else None
+    recognizer_options = {"roi_tracking": args.roi_tracking}
+    if args.latency_budget is not None:
+        recognizer_options["latency_budget"] = args.latency_budget / 1000
+    controller = RobotGestureController(backend=backend, telemetry_dir=args.telemetry, metrics_file=args.metrics,
+                                        recognizer_options=recognizer_options)
     controller.run()
 
 if __name__ == "__main__":
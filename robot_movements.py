@@ -1,10 +1,43 @@
 import math
+import threading
 import time
-import URBasic
-import matplotlib.pyplot as plt
+import numpy as np
+from camera_calibration import PixelToWorld
+from cycle_time import CycleTimeEstimator, rotation_angle
+from job_queue import JobQueue
+from kinematics import forward_kinematics_pose
+from motion_executor import CancelToken, MotionCancelled, MotionExecutor, motion_command
+from motion_metrics import MotionMetrics, timed_as
+from robot_backend import URBasicBackend
+from tool_registry import Tool, default_tool_registry
+from servo_stream import SetpointStreamer, path_duration, sample_path
+from telemetry import TelemetryRecorder
+from trajectory_planner import (ToolpathCache, closest_segment, generate_pattern, generate_raster_path, plan_raster,
+                                print_path)
+from work_grid import WorkGrid
 
 class RobotMovements:
-    def __init__(self, robot_ip='192.168.56.101', gripper=None, acceleration=0.5, velocity=0.5):
+    def __init__(self, robot_ip='192.168.56.101', gripper=None, acceleration=0.5, velocity=0.5, toolpath_cache_size=128,
+                 backend=None, lazy=False, tools=None, telemetry_dir=None, telemetry_rate=None, metrics_file=None):
+        """
+        Args:
+            robot_ip (str): IP address of the UR controller
+            acceleration (float): Acceleration for homing, tool change and transfer motions
+            velocity (float): Velocity for homing, tool change and transfer motions
+            toolpath_cache_size (int): Number of generated toolpaths kept in the cache
+            backend (RobotBackend): Robot connection to use, e.g. a SimulatedRobot. Connects to the
+                controller at robot_ip through URBasic if None
+            lazy (bool): Return immediately and connect and home the robot in the background.
+                Motion commands are queued behind the startup, see the ready future.
+            tools (ToolRegistry): Tools with width, rack slot and grinding speed limits,
+                defaults to the three tools of the rack grinding at acceleration and velocity
+            telemetry_dir (str): Record the robot state during every toolpath and write one .npz
+                file per job into this directory, None to disable recording
+            telemetry_rate (float): Telemetry samples per second, defaults to the RTDE rate of the
+                controller (state_rate of the backend)
+            metrics_file (str): Prometheus text file with the motion phase histograms, rewritten after
+                every top level motion command. None to only keep them in memory (see metrics.snapshot)
+        """
         """Initialize gripper"""
         #self.gripper = gripper
         """Initialize robot movements controller"""
@@ -12,6 +45,48 @@ class RobotMovements:
         self.velocity = velocity
         self.last_position = None
         self.current_position = None
+        self.last_cycle_time = None
+        self.current_tool = None
+
+        # Tracked robot state, None if unknown. Motions that are already satisfied are skipped.
+        self.current_joints = None
+        self.current_pose = None
+        self.joint_tolerance = 1e-3  # rad
+        self.position_tolerance = 1e-4  # m
+        self.orientation_tolerance = 1e-3  # rad
+        # True while the realtime program runs, every movej/movel program replaces it on the controller
+        self.realtime_control_initialized = False
+        self.realtime_init_time = 0.0
+        self.motion_stats = {
+            "executed_moves": 0,
+            "skipped_moves": 0,
+            "skipped_realtime_inits": 0,
+            "transfers_movej": 0,
+            "transfers_movel": 0,
+            "command_overhead": 0.0,
+            "time_saved": 0.0,
+        }
+        self.estimator = CycleTimeEstimator(acceleration=acceleration, velocity=velocity)
+        self.toolpath_cache = ToolpathCache(maxsize=toolpath_cache_size)
+        self.job_queue = JobQueue()
+        self.retract_height = 0.03  # m, lift between consecutive work areas
+        self.servo_lookahead = 0.2  # s of setpoints generated ahead of the controller when streaming
+        self.servo_deviation = 0.0005  # m, allowed corner deviation when streaming
+        self.last_stream_stats = None
+        # Set by cancel_motion from any thread, polled by the running motion
+        self.cancel_token = CancelToken()
+        # Held while a motion program is sent and while cancel_motion stops the robot, so a cancel
+        # is either seen before the send or its stopl reaches the already sent motion
+        self.send_lock = threading.Lock()
+        self.stop_acceleration = 2.0  # m/s^2, deceleration of a cancelled motion
+        self.trajectory_progress = None
+        self.interrupted_trajectory = None
+        self.telemetry_dir = telemetry_dir
+        self.telemetry_rate = telemetry_rate
+        self.telemetry = None
+        self.job_counter = 0
+        self.metrics = MotionMetrics()
+        self.metrics_file = metrics_file
 
         self.pick_up_height = 0.163
         self.component_height = 0.1825
@@ -43,80 +118,477 @@ class RobotMovements:
         math.radians(90), # Wrist 2
         math.radians(0) # Wrist 3
         )
-        
-        # Initialize robot
-        print("Initializing robot...")
-        self.robotModel = URBasic.robotModel.RobotModel()
-        # Set the IP address in the robot model
-        self.robotModel.ipAddress = robot_ip
-        
-        self.robot = URBasic.urScriptExt.UrScriptExt(
-            host=robot_ip,
-            robotModel=self.robotModel
+
+        self.PICKUP_WAVEPOINT = (
+            math.radians(-270), # Base
+            math.radians(-90), # Shoulder
+            math.radians(-100), # Elbow
+            math.radians(-75), # Wrist 1
+            math.radians(90), # Wrist 2
+            math.radians(0) # Wrist 3
         )
-        
-        
-        self.robot.reset_error()
-        print("Robot initialized")
-        
-        # Initialize robot position
-        self.move_to_wake_up_pose()
-        self.move_to_wait_for_input_pose()
+
+        self.TRAJECTORY_WAVEPOINT = (
+            math.radians(-120), # Base
+            math.radians(-75), # Shoulder
+            math.radians(-100), # Elbow
+            math.radians(-95), # Wrist 1
+            math.radians(88), # Wrist 2
+            math.radians(60) # Wrist 3
+        )
+
+        """INITIALIZE TOOLS"""
+        # Without explicit tools every tool grinds at the speeds given here, as before the registry
+        self.tools = (default_tool_registry(self.pick_up_height, feed_rate=velocity, acceleration=acceleration)
+                      if tools is None else tools)
+        # Parameters used for grinding while no tool is mounted
+        self.default_tool = Tool(None, "No tool", width=0.03, feed_rate=velocity, acceleration=acceleration)
 
         self.create_pose_pattern_for_user_interface()
+        self.camera_calibration = PixelToWorld()
 
-    def create_pose_pattern_for_user_interface(self):
-        work_height = 0.2
-        x_shift = 0.07  # shift in m
-        y_shift = 0.105  # Made positive since we'll subtract it
-        A1_x = -0.47
-        A1_y = 0.105
-        columns = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
-        
-        for row in range(1, 11):
-            for col_idx, col in enumerate(columns):
-                # X changes with column (letters)
-                x = A1_x + col_idx * x_shift
-                # Y decreases by 0.105 with each row (numbers)
-                y = A1_y - (row - 1) * y_shift
-                pose_name = f"{col}{row}"
-                setattr(self, pose_name, (x, y, work_height, 2.25, 2.25, 0))
-                print(f"Pose {pose_name}: {getattr(self, pose_name)}")
+        # All motions run in order on one worker thread. Called from other threads the motion
+        # methods return a Future instead of blocking.
+        self.executor = MotionExecutor()
+
+        # Initialize robot as the first motion command, resolved once the robot is connected and homed
+        self.robot = None
+        self.ready = self.executor.submit(self.start_up, robot_ip, backend)
+        if not lazy:
+            self.ready.result()
+
+    def start_up(self, robot_ip, backend):
+        """Connect to the robot and move it to the wait pose"""
+        try:
+            print("Initializing robot...")
+            if backend is None:
+                backend = URBasicBackend(robot_ip)
+            self.robot = backend
+
+            self.robot.reset_error()
+            print("Robot initialized")
+
+            if self.telemetry_dir is not None:
+                rate = self.robot.state_rate if self.telemetry_rate is None else self.telemetry_rate
+                self.telemetry = TelemetryRecorder(self.robot.read_state, rate=rate, directory=self.telemetry_dir)
+                self.telemetry.start()
+
+            # Initialize robot position
+            self.move_to_wake_up_pose()
+            self.move_to_wait_for_input_pose()
+            return True
+        except Exception as e:
+            print(f"Error initializing robot: {str(e)}")
+            raise
+
+    def wait_until_ready(self, timeout=None):
+        """Block until the robot is connected and homed, raises if the startup failed"""
+        if self.executor.in_worker() and not self.ready.done():
+            # Called by the startup itself
+            return
+        self.ready.result(timeout)
+
+    def close(self):
+        """Close the robot connection once all queued motions have finished"""
+        try:
+            self.wait_until_ready()
+            self.executor.submit(self.robot.close).result()
+        finally:
+            self.executor.shutdown()
+            if self.telemetry is not None:
+                self.telemetry.stop()
+
+    def create_pose_pattern_for_user_interface(self, columns=10, rows=10, column_pitch=0.07, row_pitch=0.105):
+        """Create the grid of work poses A1 ... J10 selectable in the user interface"""
+        self.work_grid = WorkGrid(
+            origin=(-0.47, 0.105),  # Pose A1
+            columns=columns,  # X changes with column (letters)
+            rows=rows,  # Y decreases with each row (numbers)
+            column_pitch=column_pitch,
+            row_pitch=row_pitch,
+            work_height=0.2,
+            orientation=(2.25, 2.25, 0)
+        )
 
 
+    @motion_command
     def move_to_jpose(self, pose):
-        """Move robot joints"""
+        """Move robot joints, skipped if the robot is already at the pose"""
+        self.wait_until_ready()
+        if self.joints_reached(pose):
+            self.skip_motion()
+            return True
+        timer = self.metrics.timer("movej")
         try:
-            self.robot.movej(q=pose, a=self.acceleration, v=self.velocity, wait=True)
+            start_joints = self.current_joints
+            start_time = time.perf_counter()
+            if not self.send_motion(self.robot.movej, q=pose, a=self.acceleration, v=self.velocity, wait=False):
+                return False
+            timer.phase("send")
+            self.robot.wait_idle()
+            timer.phase("motion")
+            if self.motion_interrupted():
+                return False
+            if start_joints is not None:
+                expected, _ = self.estimator.movej_time(start_joints, pose)
+                self.record_motion_overhead(time.perf_counter() - start_time, expected)
+            self.current_joints = tuple(pose)
+            self.current_pose = None
             self.last_position = pose
+            timer.done()
             return True
         except Exception as e:
             print(f"Error moving to pose: {str(e)}")
+            timer.failed()
+            self.current_joints = self.current_pose = None
             return False
 
-    def move_to_tpose(self, pose):
-        """Move robot TCP in Taskspace"""
+    @motion_command
+    def move_to_tpose(self, pose, acceleration=None, velocity=None):
+        """Move robot TCP in Taskspace, skipped if the TCP is already at the pose
+        Args:
+            pose (tuple): Target (x,y,z,rx,ry,rz)
+            acceleration (float): TCP acceleration, defaults to self.acceleration
+            velocity (float): TCP velocity, defaults to self.velocity
+        Returns:
+            bool: True if the motion was executed or skipped.
+                A concurrent.futures.Future of it when called from outside the motion worker
+        """
+        self.wait_until_ready()
+        if self.pose_reached(pose):
+            self.skip_motion()
+            return True
+        acceleration = self.acceleration if acceleration is None else acceleration
+        velocity = self.velocity if velocity is None else velocity
+        timer = self.metrics.timer("movel")
         try:
-            self.robot.movel(pose=pose, a=self.acceleration, v=self.velocity, wait=True)
-            self.robot.stopl(a=self.acceleration)  # Smooth deceleration
+            start_pose = self.current_pose
+            start_time = time.perf_counter()
+            if not self.send_motion(self.robot.movel, pose=pose, a=acceleration, v=velocity, wait=False):
+                return False
+            timer.phase("send")
+            self.robot.wait_idle()
+            timer.phase("motion")
+            if self.motion_interrupted():
+                return False
+            self.robot.stopl(a=acceleration)  # Smooth deceleration
+            timer.phase("stop")
+            if start_pose is not None:
+                expected, _ = self.estimator_for(acceleration, velocity).movel_time(start_pose, pose)
+                self.record_motion_overhead(time.perf_counter() - start_time, expected)
+            self.current_pose = tuple(pose)
+            self.current_joints = None
             self.last_position = pose
+            timer.done()
             return True
         except Exception as e:
             print(f"Error moving to pose: {str(e)}")
+            timer.failed()
+            self.current_joints = self.current_pose = None
             return False
+
+    @motion_command
+    def move_to_transfer_pose(self, pose):
+        """
+        Move robot TCP to pose on a transfer segment, one that does not need a straight TCP path.
+
+        The segment runs as movej or movel, whichever the timing model predicts to be faster.
+        Falls back to movel if the pose has no IK solution near the current configuration.
+        """
+        self.wait_until_ready()
+        if self.pose_reached(pose):
+            self.skip_motion()
+            return True
+        try:
+            start_joints = self.actual_joints()
+            # The controller's TCP pose, the kinematics only know the flange
+            start_pose = self.actual_pose()
+            motion, expected, _, _ = self.estimator.transfer_time(start_joints, start_pose, pose)
+        except Exception as e:
+            print(f"Could not plan transfer, moving linearly: {str(e)}")
+            motion = "movel"
+        self.motion_stats[f"transfers_{motion}"] += 1
+        if motion == "movel":
+            return self.move_to_tpose(pose)
+
+        timer = self.metrics.timer("movej_pose")
+        try:
+            start_time = time.perf_counter()
+            if not self.send_motion(self.robot.movej_pose, pose=pose, a=self.acceleration, v=self.velocity,
+                                    wait=False):
+                return False
+            timer.phase("send")
+            self.robot.wait_idle()
+            timer.phase("motion")
+            if self.motion_interrupted():
+                return False
+            self.record_motion_overhead(time.perf_counter() - start_time, expected)
+            self.current_pose = tuple(pose)
+            self.current_joints = None
+            self.last_position = pose
+            timer.done()
+            return True
+        except Exception as e:
+            print(f"Error moving to pose: {str(e)}")
+            timer.failed()
+            self.current_joints = self.current_pose = None
+            return False
+
+    def send_motion(self, command, *args, **kwargs):
+        """
+        Send a motion program to the robot unless a cancel came first.
+
+        The token is checked again right before the send, under the lock cancel_motion takes
+        around its stopl, so a cancel during the send stops the motion that was just sent.
+        Returns:
+            bool: False if the motion was cancelled and not sent
+        """
+        with self.send_lock:
+            if self.cancel_token.cancelled:
+                return False
+            self.realtime_control_initialized = False
+            command(*args, **kwargs)
+            return True
+
+    def motion_interrupted(self):
+        """True if the motion that just returned was stopped by cancel_motion, the robot position is unknown then"""
+        if not self.cancel_token.cancelled:
+            return False
+        self.current_joints = self.current_pose = None
+        return True
+
+    def cancel_motion(self, retract=True):
+        """
+        Stop the running motion and drop all queued motions, callable from any thread.
+
+        The stop bypasses the motion queue: stopl is sent right away and the running motion
+        command ends with MotionCancelled. An interrupted trajectory can be continued with
+        resume_trajectory.
+        Args:
+            retract (bool): Lift the tool off the part and return to the wait pose after the stop
+        Returns:
+            Future: Resolved once the robot has stopped (and retracted)
+        """
+        with self.send_lock:
+            self.cancel_token.cancel()
+            if self.robot is not None:
+                try:
+                    self.robot.stopl(a=self.stop_acceleration)
+                except Exception as e:
+                    print(f"Error stopping robot: {str(e)}")
+        # Runs right after the cancelled command, ahead of everything submitted afterwards
+        done, cancelled = self.executor.preempt(self.cancel_token.reset)
+        print(f"Motion cancelled, {cancelled} queued commands dropped")
+        if retract:
+            done = self.retract_to_wait_pose()
+        return done
+
+    @motion_command
+    @timed_as("retract")
+    def retract_to_wait_pose(self):
+        """Lift the tool straight up from wherever it is and move to the wait pose"""
+        self.move_to_tpose(self.lifted(self.actual_pose()))
+        self.move_to_wait_for_input_pose()
+
+    def actual_pose(self):
+        """TCP pose of the robot, queried from the controller if it is not tracked"""
+        if self.current_pose is None:
+            self.current_pose = tuple(self.robot.get_actual_tcp_pose())
+        return self.current_pose
+
+    def actual_joints(self):
+        """Joint angles of the robot, queried from the controller if they are not tracked"""
+        if self.current_joints is None:
+            self.current_joints = tuple(self.robot.get_actual_joint_positions())
+        return self.current_joints
+
+    def estimator_for(self, acceleration, velocity):
+        """Timing model for TCP motions at the given speed, joint motions keep the global limits"""
+        if acceleration == self.acceleration and velocity == self.velocity:
+            return self.estimator
+        return CycleTimeEstimator(acceleration=acceleration, velocity=velocity,
+                                  joint_acceleration=self.acceleration, joint_velocity=self.velocity)
+
+    def joints_reached(self, joints):
+        """Check if the robot joints are within joint_tolerance of the given joint angles"""
+        if self.current_joints is None:
+            try:
+                self.current_joints = tuple(self.robot.get_actual_joint_positions())
+            except Exception:
+                return False
+        return max(abs(a - b) for a, b in zip(self.current_joints, joints)) <= self.joint_tolerance
+
+    def pose_reached(self, pose):
+        """Check if the TCP is within position_tolerance and orientation_tolerance of the given pose"""
+        if self.current_pose is None:
+            try:
+                self.current_pose = tuple(self.robot.get_actual_tcp_pose())
+            except Exception:
+                return False
+        return (math.dist(self.current_pose[:3], pose[:3]) <= self.position_tolerance
+                and rotation_angle(self.current_pose, pose) <= self.orientation_tolerance)
+
+    def skip_motion(self):
+        """Count a motion that was already satisfied, it saves the per command overhead"""
+        self.motion_stats["skipped_moves"] += 1
+        self.motion_stats["time_saved"] += self.motion_stats["command_overhead"]
+
+    def record_motion_overhead(self, wall_time, expected_time):
+        """Update the running mean of the time a motion command takes beyond its motion"""
+        stats = self.motion_stats
+        stats["executed_moves"] += 1
+        overhead = max(0.0, wall_time - expected_time)
+        stats["command_overhead"] += (overhead - stats["command_overhead"]) / stats["executed_moves"]
+
+    @motion_command
+    def init_realtime_control(self):
+        """Start realtime control, skipped if no motion program has replaced it since the last start"""
+        self.wait_until_ready()
+        if self.realtime_control_initialized:
+            self.motion_stats["skipped_realtime_inits"] += 1
+            self.motion_stats["time_saved"] += self.realtime_init_time
+            return
+        start_time = time.perf_counter()
+        self.robot.init_realtime_control()
+        self.realtime_init_time = time.perf_counter() - start_time
+        self.realtime_control_initialized = True
+
+    def print_motion_stats(self):
+        stats = self.motion_stats
+        print(f"Executed moves: {stats['executed_moves']}, skipped moves: {stats['skipped_moves']}, "
+              f"skipped realtime inits: {stats['skipped_realtime_inits']}, time saved: {stats['time_saved']:.2f} s")
+        print(f"Transfers as movej: {stats['transfers_movej']}, as movel: {stats['transfers_movel']}")
         
+    @motion_command
+    def move_to_tpath(self, poses, blend_radius=0.005, acceleration=None, velocity=None):
+        """Move robot TCP through all poses as one blended motion
+        Args:
+            poses (list): List of (x,y,z,rx,ry,rz) poses
+            blend_radius (float or list): Blend radius in meters, either one value for all corners
+                or one value per pose. Radii are clipped so neighbouring blends never overlap.
+            acceleration (float): TCP acceleration, defaults to self.acceleration
+            velocity (float): TCP velocity, defaults to self.velocity
+        Returns:
+            bool: True if the motion was executed.
+                A concurrent.futures.Future of it when called from outside the motion worker
+        """
+        poses = [tuple(float(value) for value in pose) for pose in poses]
+        if not poses:
+            return True
+        self.wait_until_ready()
+        radii = self.clip_blend_radii(poses, blend_radius)
+        acceleration = self.acceleration if acceleration is None else acceleration
+        velocity = self.velocity if velocity is None else velocity
+
+        timer = self.metrics.timer("movel_path")
+        try:
+            if not self.send_motion(self.robot.movel_path, poses, a=acceleration, v=velocity, radii=radii,
+                                    wait=False):
+                return False
+            timer.phase("send")
+            self.robot.wait_idle()
+            timer.phase("motion")
+            if self.motion_interrupted():
+                return False
+            self.current_pose = poses[-1]
+            self.current_joints = None
+            self.last_position = poses[-1]
+            timer.done()
+            return True
+        except Exception as e:
+            print(f"Error moving along path: {str(e)}")
+            timer.failed()
+            self.current_joints = self.current_pose = None
+            return False
+
+    @motion_command
+    def move_to_tpath_streamed(self, poses, rate=125, acceleration=None, velocity=None):
+        """Move robot TCP along all poses by streaming setpoints through the realtime interface
+        Args:
+            poses (list): List of (x,y,z,rx,ry,rz) poses
+            rate (float): Setpoint rate in Hz, 125 for CB3 or 500 for e-Series controllers
+            acceleration (float): TCP acceleration, defaults to self.acceleration
+            velocity (float): Feed rate along the path, defaults to self.velocity
+        Returns:
+            bool: True if the motion was executed.
+                A concurrent.futures.Future of it when called from outside the motion worker
+        """
+        poses = [tuple(float(value) for value in pose) for pose in poses]
+        if not poses:
+            return True
+        self.wait_until_ready()
+        acceleration = self.acceleration if acceleration is None else acceleration
+        velocity = self.velocity if velocity is None else velocity
+        # Streaming starts from standstill at the first pose
+        if not self.move_to_tpose(poses[0], acceleration=acceleration, velocity=velocity):
+            return False
+
+        timer = self.metrics.timer("servo_stream")
+        try:
+            # The approach movel has replaced the realtime program, restart it for the stream
+            self.init_realtime_control()
+            timer.phase("send")
+            streamer = SetpointStreamer(self.robot.set_realtime_pose, rate=rate, lookahead=self.servo_lookahead)
+            self.last_stream_stats = streamer.stream(
+                sample_path(poses, velocity, acceleration, rate=rate, deviation=self.servo_deviation),
+                cancelled=lambda: self.cancel_token.cancelled)
+            timer.phase("motion")
+            if self.motion_interrupted():
+                return False
+            expected = path_duration(poses, velocity, acceleration, deviation=self.servo_deviation)
+            self.record_motion_overhead(self.last_stream_stats["duration"], expected)
+            self.current_pose = poses[-1]
+            self.current_joints = None
+            self.last_position = poses[-1]
+            timer.done()
+            return True
+        except Exception as e:
+            print(f"Error streaming path: {str(e)}")
+            timer.failed()
+            self.robot.stopl(a=acceleration)
+            self.current_joints = self.current_pose = None
+            return False
+
+    def clip_blend_radii(self, poses, blend_radius):
+        """Limit the blend radius of every corner to half of its shorter adjacent segment"""
+        if np.ndim(blend_radius) == 0:  # Also NumPy scalars and 0-d arrays
+            radii = [float(blend_radius)] * len(poses)
+        else:
+            radii = [float(radius) for radius in blend_radius]
+            if len(radii) != len(poses):
+                raise ValueError(f"Expected {len(poses)} blend radii, got {len(radii)}")
+
+        segment_lengths = [math.dist(a[:3], b[:3]) for a, b in zip(poses[:-1], poses[1:])]
+        clipped = []
+        for i, radius in enumerate(radii):
+            # The first and last pose are exact stops
+            if i == 0 or i == len(poses) - 1:
+                clipped.append(0.0)
+                continue
+            limit = 0.5 * min(segment_lengths[i - 1], segment_lengths[i])
+            clipped.append(max(0.0, min(radius, limit)))
+        return clipped
+
+    @motion_command
+    @timed_as("homing")
     def move_to_wake_up_pose(self):
         self.move_to_jpose(self.ROBOT_WAKEUP_POSE)
-        self.robot.init_realtime_control()
+        self.init_realtime_control()
 
+    @motion_command
+    @timed_as("homing")
     def move_to_standby_pose(self):
         self.move_to_jpose(self.ROBOT_STANDBY_POSE)
-        self.robot.init_realtime_control()
+        self.init_realtime_control()
 
+    @motion_command
+    @timed_as("homing")
     def move_to_wait_for_input_pose(self):
         self.move_to_jpose(self.ROBOT_WAIT_FOR_INPUT_POSE)
-        self.robot.init_realtime_control()
+        self.init_realtime_control()
 
+    @motion_command
+    @timed_as("gesture")
     def perform_nod_movement(self):
         self.NOD_WAVEPOINT = (
         math.radians(0), # Base
@@ -131,6 +603,8 @@ class RobotMovements:
         self.move_to_jpose(self.NOD_WAVEPOINT)
         self.move_to_jpose(self.ROBOT_WAIT_FOR_INPUT_POSE)  
         
+    @motion_command
+    @timed_as("gesture")
     def perform_redo_movement(self):    
         self.REDO_WAVEPOINT_TOP = (
         math.radians(0), # Base
@@ -155,6 +629,8 @@ class RobotMovements:
         self.move_to_jpose(self.ROBOT_STANDBY_POSE)
  
 
+    @motion_command
+    @timed_as("gesture")
     def perform_decline_movement(self):
         self.DECLINE_WAVEPOINT_START = (
         math.radians(3), # Base
@@ -179,95 +655,136 @@ class RobotMovements:
         self.move_to_jpose(self.ROBOT_STANDBY_POSE)
         self.move_to_jpose(self.ROBOT_WAIT_FOR_INPUT_POSE)
 
+    def tool_rack_poses(self, tool_number):
+        """Return the (hover, pick up) poses of a tool slot in the rack"""
+        tool = self.tools.get(tool_number)
+        if tool.pick_up_pose is None:
+            raise ValueError(f"Tool {tool_number} has no rack slot")
+        return tool.hover_pose, tool.pick_up_pose
+
+    def tool_spec(self, tool_number=None):
+        """Registered Tool for tool_number, default_tool if no tool is given"""
+        if tool_number is None:
+            return self.default_tool
+        return self.tools.get(tool_number)
+
+    @motion_command
+    @timed_as("get_tool")
     def get_tool(self, tool_number=1, tool_pick_up_height=0.1):
+        hover, pick_up = self.tool_rack_poses(tool_number)
 
+        self.move_to_jpose(self.PICKUP_WAVEPOINT)
+        self.move_to_transfer_pose(hover)
+        self.move_to_tpose(pick_up)
+        """close gripper"""
+        #self.gripper.close()
+        self.move_to_tpose(hover)
+        self.current_tool = tool_number
 
-        self.PICKUP_TOOL_1_HOVER = (0.0247, 0.34, 0.25, 3.154, 0.094, 0.012)
-        self.PICKUP_TOOL_1 = (0.0247, 0.34, self.pick_up_height, 3.154, 0.094, 0.012)
-        
-        self.PICKUP_TOOL_2_HOVER = (0.133, 0.34, 0.25, 3.151, 0.088, -0.032)
-        self.PICKUP_TOOL_2 = (0.133, 0.34, self.pick_up_height, 3.151, 0.088, -0.032)
-        
-        self.PICKUP_TOOL_3_HOVER = (0.233, 0.34, 0.25, 3.144, 0.007, -0.023)
-        self.PICKUP_TOOL_3 = (0.233, 0.34, self.pick_up_height, 3.144, 0.007, -0.023)
-        
-        
-        self.PICKUP_WAVEPOINT = (
-            math.radians(-270), # Base
-            math.radians(-90), # Shoulder
-            math.radians(-100), # Elbow
-            math.radians(-75), # Wrist 1
-            math.radians(90), # Wrist 2
-            math.radians(0) # Wrist 3
-        )
+    @motion_command
+    @timed_as("drop_tool")
+    def drop_tool(self, tool_number=1, tool_pick_up_height=0.1):
+        hover, pick_up = self.tool_rack_poses(tool_number)
 
+        self.move_to_jpose(self.PICKUP_WAVEPOINT)
+        self.move_to_transfer_pose(hover)
+        self.move_to_tpose(pick_up)
+        """open gripper"""
+        #self.gripper.open()
+        self.move_to_tpose(hover)
+        self.current_tool = None
+
+    @motion_command
+    @timed_as("swap_tool")
+    def swap_tool(self, old_tool, new_tool):
+        """
+        Drop the current tool and pick up a new one in a single pass through the tool rack.
+
+        The pickup waypoint is only visited once and the robot travels directly from the hover
+        pose of the old slot to the hover pose of the new slot.
+        Args:
+            old_tool (int): Tool currently held, None if the gripper is empty
+            new_tool (int): Tool to pick up, None to only drop the old tool
+        """
+        if old_tool == new_tool:
+            return
+        if old_tool is None:
+            self.get_tool(new_tool)
+            return
+        if new_tool is None:
+            self.drop_tool(old_tool)
+            return
+
+        old_hover, old_pick_up = self.tool_rack_poses(old_tool)
+        new_hover, new_pick_up = self.tool_rack_poses(new_tool)
 
         self.move_to_jpose(self.PICKUP_WAVEPOINT)
-        
+        self.move_to_transfer_pose(old_hover)
+        self.move_to_tpose(old_pick_up)
+        """open gripper"""
+        #self.gripper.open()
+        self.move_to_tpose(old_hover)
+        self.current_tool = None
 
-        if tool_number == 1:
-            self.move_to_tpose(self.PICKUP_TOOL_1_HOVER)
-            self.move_to_tpose(self.PICKUP_TOOL_1)
-            """close gripper"""
-            #self.gripper.close()
-            self.move_to_tpose(self.PICKUP_TOOL_1_HOVER)
-        elif tool_number == 2:
-            self.move_to_tpose(self.PICKUP_TOOL_2_HOVER)
-            self.move_to_tpose(self.PICKUP_TOOL_2)
-            """close gripper"""
-            #self.gripper.close()
-            self.move_to_tpose(self.PICKUP_TOOL_2_HOVER)
-        elif tool_number == 3:
-            self.move_to_tpose(self.PICKUP_TOOL_3_HOVER)
-            self.move_to_tpose(self.PICKUP_TOOL_3)
-            """close gripper"""
-            #self.gripper.close()
-            self.move_to_tpose(self.PICKUP_TOOL_3_HOVER)
-        
+        self.move_to_transfer_pose(new_hover)
+        self.move_to_tpose(new_pick_up)
+        """close gripper"""
+        #self.gripper.close()
+        self.move_to_tpose(new_hover)
+        self.current_tool = new_tool
 
-    def drop_tool(self, tool_number=1, tool_pick_up_height=0.1):
-        
-        self.PICKUP_TOOL_1_HOVER = (0.0247, 0.34, 0.25, 3.154, 0.094, 0.012)
-        self.PICKUP_TOOL_1 = (0.0247, 0.34, self.pick_up_height, 3.154, 0.094, 0.012)
-        
-        self.PICKUP_TOOL_2_HOVER = (0.133, 0.34, 0.25, 3.151, 0.088, -0.032)
-        self.PICKUP_TOOL_2 = (0.133, 0.34, self.pick_up_height, 3.151, 0.088, -0.032)
-        
-        self.PICKUP_TOOL_3_HOVER = (0.233, 0.34, 0.25, 3.144, 0.007, -0.023)
-        self.PICKUP_TOOL_3 = (0.233, 0.34, self.pick_up_height, 3.144, 0.007, -0.023)
-        
+    def swap_tool_moves(self, old_tool, new_tool):
+        """
+        Motion sequence of swap_tool as (kind, target) tuples.
 
-        self.PICKUP_WAVEPOINT = (
-            math.radians(-270), # Base
-            math.radians(-90), # Shoulder
-            math.radians(-100), # Elbow
-            math.radians(-75), # Wrist 1
-            math.radians(90), # Wrist 2
-            math.radians(0) # Wrist 3
-        )
+        kind is "movej" for joint targets, "movel" for process segments that have to keep the TCP on
+        a straight line and "transfer" for segments that run as whichever of movej and movel is faster.
+        """
+        if old_tool == new_tool:
+            return []
+        if old_tool is None:
+            return self.get_tool_moves(new_tool)
+        if new_tool is None:
+            return self.drop_tool_moves(old_tool)
+        old_hover, old_pick_up = self.tool_rack_poses(old_tool)
+        new_hover, new_pick_up = self.tool_rack_poses(new_tool)
+        return [("movej", self.PICKUP_WAVEPOINT),
+                ("transfer", old_hover), ("movel", old_pick_up), ("movel", old_hover),
+                ("transfer", new_hover), ("movel", new_pick_up), ("movel", new_hover)]
 
+    def get_tool_moves(self, tool_number):
+        """Motion sequence of get_tool as (kind, target) tuples, see swap_tool_moves"""
+        hover, pick_up = self.tool_rack_poses(tool_number)
+        return [("movej", self.PICKUP_WAVEPOINT), ("transfer", hover), ("movel", pick_up), ("movel", hover)]
 
-        self.move_to_jpose(self.PICKUP_WAVEPOINT)
-        
+    def drop_tool_moves(self, tool_number):
+        """Motion sequence of drop_tool as (kind, target) tuples, see swap_tool_moves"""
+        hover, pick_up = self.tool_rack_poses(tool_number)
+        return [("movej", self.PICKUP_WAVEPOINT), ("transfer", hover), ("movel", pick_up), ("movel", hover)]
+
+    def trajectory_moves(self, x1, y1, x2, y2, tool=None, pattern="auto"):
+        """Motion sequence of perform_trajectory as (kind, target) tuples, see swap_tool_moves"""
+        trajectory = self.get_toolpath((x1, y1), (x2, y2), tool, pattern)
+        return ([("movej", self.ROBOT_WAIT_FOR_INPUT_POSE), ("movej", self.TRAJECTORY_WAVEPOINT),
+                 ("transfer", trajectory[0])]
+                + [("movel", point) for point in trajectory[1:]]
+                + [("movej", self.ROBOT_WAIT_FOR_INPUT_POSE)])
 
-        if tool_number == 1:
-            self.move_to_tpose(self.PICKUP_TOOL_1_HOVER)
-            self.move_to_tpose(self.PICKUP_TOOL_1)
-            """close gripper"""
-            #self.gripper.open()
-            self.move_to_tpose(self.PICKUP_TOOL_1_HOVER)
-        elif tool_number == 2:
-            self.move_to_tpose(self.PICKUP_TOOL_2_HOVER)
-            self.move_to_tpose(self.PICKUP_TOOL_2)
-            """close gripper"""
-            #self.gripper.open()
-            self.move_to_tpose(self.PICKUP_TOOL_2_HOVER)
-        elif tool_number == 3:
-            self.move_to_tpose(self.PICKUP_TOOL_3_HOVER)
-            self.move_to_tpose(self.PICKUP_TOOL_3)
-            """close gripper"""
-            #self.gripper.open()
-            self.move_to_tpose(self.PICKUP_TOOL_3_HOVER)
+    def estimate_cycle_time(self, moves, start_joints=None):
+        """
+        Predict the duration of a motion sequence without moving the robot.
+        Args:
+            moves (list): Sequence of ("movej", joints), ("movel", pose) or ("transfer", pose) tuples,
+                e.g. from get_tool_moves
+            start_joints (tuple): Joint angles before the first move, defaults to ROBOT_WAIT_FOR_INPUT_POSE
+        Returns:
+            list: SegmentEstimate with the expected duration of every segment. Not a motion command,
+                it runs on the calling thread and returns the list directly, also while the robot moves
+        """
+        if start_joints is None:
+            start_joints = self.ROBOT_WAIT_FOR_INPUT_POSE
+        estimator = CycleTimeEstimator(acceleration=self.acceleration, velocity=self.velocity)
+        return estimator.estimate(moves, start_joints)
 
 
     def pixel_to_world_backup(self, x, y):
@@ -322,88 +839,290 @@ class RobotMovements:
     
 
     def pixel_to_world(self, pixel_x, pixel_y):
-        # Bottom Left in world coordinates
-        A1_x_world = -0.29505
-        A1_y_world = -0.20990
-        # Bottom Right in world coordinates
-        K1_x_world = -0.30040
-        K1_y_world = -0.43423
-        # Top Left in world coordinates
-        A2_x_world = -0.09682
-        A2_y_world = -0.21371
-        # Top Right in world coordinates
-        K2_x_world = -0.09999
-        K2_y_world = -0.44149
-        
-        # Bottom Left in pixel coordinates
-        A1_x_pixel = 194
-        A1_y_pixel = 347
-        # Bottom Right in pixel coordinates
-        K1_x_pixel = 326
-        K1_y_pixel = 343
-        # Top Left in pixel coordinates
-        A2_x_pixel = 198
-        A2_y_pixel = 235
-        # Top Right in pixel coordinates
-        K2_x_pixel = 325
-        K2_y_pixel = 238
-        
-        # Calculate scaling factors
-        scale_x = (K2_x_world - A1_x_world) / (K2_x_pixel - A1_x_pixel)
-        scale_y = (K2_y_world - A1_y_world) / (K2_y_pixel - A1_y_pixel)
-        
-        # Calculate offsets
-        offset_x = A1_x_world - A1_x_pixel * scale_x
-        offset_y = A1_y_world - A1_y_pixel * scale_y
-        
-        # Transform coordinates
-        world_x = pixel_x * scale_x + offset_x
-        world_y = pixel_y * scale_y + offset_y
-        
-        return world_x, world_y
+        """Transform pixel coordinates to world coordinates using the calibrated homography"""
+        return self.camera_calibration(pixel_x, pixel_y)
+
+    def pixels_to_world(self, pixel_points):
+        """Transform an (N, 2) array of pixel coordinates to an (N, 2) array of world coordinates"""
+        return self.camera_calibration.transform(pixel_points)
 
     
-    def perform_trajectory(self, x1, y1, x2, y2):
+    @motion_command
+    @timed_as("trajectory")
+    def perform_trajectory(self, x1, y1, x2, y2, blend_radius=None, pattern="auto", servo_rate=None):
+        """
+        Grind the rectangular area between two points, starting and ending at the wait pose.
+        Args:
+            x1, y1 (float): Start point in world coordinates (m)
+            x2, y2 (float): End point in world coordinates (m)
+            blend_radius (float or list): None to stop at every corner point (movel per waypoint),
+                otherwise the path is sent as one blended motion with this blend radius per corner
+            pattern (str): Raster pattern, "auto" picks the one with the lowest estimated cycle time
+            servo_rate (float): Stream the raster through the realtime interface at this setpoint rate
+                in Hz instead of sending motion commands, blend_radius is ignored then
+        Returns:
+            float: Measured cycle time of the raster in seconds.
+                A concurrent.futures.Future of it when called from outside the motion worker
+        """
         self.move_to_wait_for_input_pose()
-        self.TRAJECTORY_WAVEPOINT = (
-            math.radians(-120), # Base
-            math.radians(-75), # Shoulder
-            math.radians(-100), # Elbow
-            math.radians(-95), # Wrist 1
-            math.radians(88), # Wrist 2
-            math.radians(60) # Wrist 3
-        )
+        cycle_time = self.grind_area(x1, y1, x2, y2, blend_radius=blend_radius, pattern=pattern,
+                                     servo_rate=servo_rate)
+        self.move_to_wait_for_input_pose()
+        return cycle_time
 
-        self.move_to_jpose(self.TRAJECTORY_WAVEPOINT)
+    @motion_command
+    @timed_as("trajectory")
+    def grind_area(self, x1, y1, x2, y2, blend_radius=None, pattern="auto", approach_from_waypoint=True,
+                   servo_rate=None):
+        """
+        Grind the rectangular area between two points without returning to the wait pose.
+        Args:
+            x1, y1 (float): Start point in world coordinates (m)
+            x2, y2 (float): End point in world coordinates (m)
+            blend_radius (float or list): None to stop at every corner point, otherwise the blend radius
+            pattern (str): Raster pattern, "auto" picks the one with the lowest estimated cycle time
+            approach_from_waypoint (bool): Approach through TRAJECTORY_WAVEPOINT. Otherwise the tool is
+                lifted by retract_height and moved straight to the new area. Either way it arrives
+                retract_height above the first corner and moves down onto it with the tool feed.
+            servo_rate (float): Stream the raster at this setpoint rate in Hz, None to send motion commands
+        Returns:
+            float: Measured cycle time of the raster in seconds.
+                A concurrent.futures.Future of it when called from outside the motion worker
+        """
         # Berechnung der Start- und Endpunkte
         start_point = (x1, y1)
         end_point = (x2, y2)
-        print("STARTPOINTS" + str(start_point))
-        print("Endpoints" +str(end_point))
 
-        # Beispielwerte für die Höhe und Werkzeugbreite
-        #component_height = 0.2  # in Metern
-        tool_width = 0.03  # in Metern
+        # Breite, Stepover und Vorschub des montierten Werkzeugs
+        tool = self.tool_spec(self.current_tool)
 
         # Generiere die Trajektorie basierend auf den Weltkoordinaten
-        trajectory = self.generate_trajectory_path(
-            start_point=start_point,
-            end_point=end_point,
-            component_height=self.component_height,
-            tool_width=tool_width
-        )
+        trajectory = self.get_toolpath(start_point, end_point, self.current_tool, pattern,
+                                       self.corner_deviation(blend_radius, servo_rate))
+
+        if approach_from_waypoint or self.current_pose is None:
+            self.move_to_jpose(self.TRAJECTORY_WAVEPOINT)
+        else:
+            self.move_to_tpose(self.lifted(self.current_pose))
+        # Über der ersten Ecke ankommen und erst dann auf das Bauteil absenken
+        self.move_to_transfer_pose(self.lifted(trajectory[0]))
+        self.move_to_tpose(trajectory[0], acceleration=tool.acceleration, velocity=tool.feed_rate)
 
         # Fahre die generierte Trajektorie ab
-        for point in trajectory:
-            try:
-                self.move_to_tpose(point)
-            except Exception as e:
-                print(f"Error moving to point {point}: {str(e)}")
-                self.robot.stopl(a=self.acceleration)  # Smooth deceleration in case of error
+        self.interrupted_trajectory = None
+        return self.grind_toolpath(trajectory, blend_radius=blend_radius, servo_rate=servo_rate)
+
+    def grind_toolpath(self, trajectory, blend_radius=None, servo_rate=None, start_index=0):
+        """
+        Run a toolpath with the mounted tool from trajectory[start_index] on.
 
+        Progress is kept in trajectory_progress. If the run is cancelled, everything needed to
+        continue from the last completed corner is kept in interrupted_trajectory.
+        Returns:
+            float: Measured cycle time in seconds
+        """
+        tool = self.tool_spec(self.current_tool)
+        total = len(trajectory) - 1
+        self.trajectory_progress = {"completed_segments": start_index, "total_segments": total}
+        if self.telemetry is not None:
+            self.telemetry.begin_job()
+        start_time = time.perf_counter()
+        cancelled = False
+        try:
+            if servo_rate is not None:
+                self.move_to_tpath_streamed(trajectory[start_index:], rate=servo_rate,
+                                            acceleration=tool.acceleration, velocity=tool.feed_rate)
+            elif blend_radius is None:
+                for i in range(start_index, len(trajectory)):
+                    try:
+                        if self.move_to_tpose(trajectory[i], acceleration=tool.acceleration, velocity=tool.feed_rate):
+                            self.trajectory_progress["completed_segments"] = max(start_index, i)
+                    except MotionCancelled:
+                        raise
+                    except Exception as e:
+                        print(f"Error moving to point {trajectory[i]}: {str(e)}")
+                        self.robot.stopl(a=tool.acceleration)  # Smooth deceleration in case of error
+            else:
+                self.move_to_tpath(trajectory[start_index:], blend_radius=blend_radius,
+                                   acceleration=tool.acceleration, velocity=tool.feed_rate)
+            self.cancel_token.raise_if_cancelled()
+        except MotionCancelled as e:
+            cancelled = True
+            if servo_rate is not None or blend_radius is not None:
+                # One command for the whole path, the stop position tells how far it got
+                passed = closest_segment(trajectory[start_index:], self.actual_pose())
+                self.trajectory_progress["completed_segments"] = start_index + passed
+            completed = self.trajectory_progress["completed_segments"]
+            self.interrupted_trajectory = {
+                "trajectory": trajectory,
+                "tool": self.current_tool,
+                "start_index": completed,
+                "blend_radius": blend_radius,
+                "servo_rate": servo_rate,
+            }
+            raise MotionCancelled(f"Trajectory cancelled after {completed} of {total} segments",
+                                  progress=dict(self.trajectory_progress)) from e
+        finally:
+            if self.telemetry is not None:
+                self.flush_telemetry(trajectory, start_index, time.perf_counter() - start_time, cancelled)
+        self.trajectory_progress["completed_segments"] = total
+
+        self.last_cycle_time = time.perf_counter() - start_time
+        if servo_rate is not None:
+            mode = f"streamed ({servo_rate} Hz)"
+        else:
+            mode = "stop-and-go" if blend_radius is None else f"blended (r={blend_radius})"
+        print(f"Trajectory cycle time ({mode}): {self.last_cycle_time:.2f} s for {len(trajectory) - start_index} points")
+        return self.last_cycle_time
+
+    def flush_telemetry(self, trajectory, start_index, cycle_time, cancelled):
+        """Write the telemetry of the toolpath that just ended, together with the planned path"""
+        self.job_counter += 1
+        name = f"job_{time.strftime('%Y%m%d_%H%M%S')}_{self.job_counter:04d}"
+        path = self.telemetry.flush_job(name, planned_path=trajectory, start_index=start_index,
+                                        tool=self.current_tool, cycle_time=cycle_time, cancelled=cancelled)
+        print(f"Telemetry written to {path}")
+
+    @motion_command
+    @timed_as("trajectory")
+    def resume_trajectory(self):
+        """
+        Continue the last cancelled trajectory from its last completed corner and return to the wait pose.
+        Returns:
+            float: Measured cycle time of the remaining raster in seconds, None if there is nothing to resume.
+                A concurrent.futures.Future of it when called from outside the motion worker
+        """
+        state = self.interrupted_trajectory
+        if state is None:
+            print("No interrupted trajectory to resume")
+            return None
+        trajectory = state["trajectory"]
+        resume_point = trajectory[state["start_index"]]
+        print(f"Resuming trajectory at segment {state['start_index']} of {len(trajectory) - 1}")
+
+        if state["tool"] != self.current_tool:
+            self.swap_tool(self.current_tool, state["tool"])
+            self.move_to_jpose(self.TRAJECTORY_WAVEPOINT)
+        else:
+            self.move_to_tpose(self.lifted(self.actual_pose()))
+        self.move_to_transfer_pose(self.lifted(resume_point))
+        tool = self.tool_spec(self.current_tool)
+        self.move_to_tpose(resume_point, acceleration=tool.acceleration, velocity=tool.feed_rate)
+
+        self.interrupted_trajectory = None
+        cycle_time = self.grind_toolpath(trajectory, blend_radius=state["blend_radius"],
+                                         servo_rate=state["servo_rate"], start_index=state["start_index"])
         self.move_to_wait_for_input_pose()
-                
-    def generate_trajectory_path(self, start_point, end_point, component_height, tool_width):
+        return cycle_time
+
+    def lifted(self, pose):
+        """Pose moved up by retract_height"""
+        return (pose[0], pose[1], pose[2] + self.retract_height, *pose[3:6])
+
+    @motion_command
+    @timed_as("jobs")
+    def run_jobs(self, jobs=None, blend_radius=None, pattern="auto", servo_rate=None):
+        """
+        Grind all queued work areas back to back.
+
+        Jobs are grouped by tool and ordered by JobQueue.plan. Consecutive areas with the same tool
+        are connected by a short retract move instead of a trip to the wait pose.
+        Args:
+            jobs (JobQueue): Jobs to run, defaults to self.job_queue. Finished jobs are removed from
+                the queue, if the run is cancelled the jobs that were not started stay queued and
+                the interrupted one can be continued with resume_trajectory.
+            blend_radius (float or list): None for stop-and-go, otherwise the blend radius of every raster
+            pattern (str): Raster pattern of every area
+            servo_rate (float): Stream every raster at this setpoint rate in Hz, None to send motion commands
+        Returns:
+            list: Measured cycle time of every area in execution order.
+                A concurrent.futures.Future of it when called from outside the motion worker
+        """
+        queue = self.job_queue if jobs is None else jobs
+        waypoint_xy = forward_kinematics_pose(self.TRAJECTORY_WAVEPOINT)[:2]
+        plan = queue.plan(current_tool=self.current_tool, start=waypoint_xy)
+        print(f"Running {len(plan)} jobs with {len({job.tool for job in plan})} tools")
+
+        self.move_to_wait_for_input_pose()
+        cycle_times = []
+        try:
+            for job in plan:
+                approach_from_waypoint = job.tool != self.current_tool
+                if approach_from_waypoint:
+                    self.swap_tool(self.current_tool, job.tool)
+                try:
+                    cycle_times.append(self.grind_area(job.x1, job.y1, job.x2, job.y2, blend_radius=blend_radius,
+                                                       pattern=pattern, approach_from_waypoint=approach_from_waypoint,
+                                                       servo_rate=servo_rate))
+                finally:
+                    queue.remove(job)
+        finally:
+            # Leave the part also after a failed area, a cancelled run is retracted by cancel_motion
+            if not self.cancel_token.cancelled:
+                if plan:
+                    # The tracked pose is unknown after a failed move, lift from the actual one
+                    self.move_to_tpose(self.lifted(self.actual_pose()))
+                self.move_to_wait_for_input_pose()
+        return cycle_times
+
+    def corner_deviation(self, blend_radius=None, servo_rate=None):
+        """How far a path run with these settings leaves its corners, None if it stops at every corner"""
+        if servo_rate is not None:
+            return self.servo_deviation
+        if blend_radius is not None:
+            # A blend can round the corner off by up to its radius
+            return float(np.max(blend_radius))
+        return None
+
+    def get_toolpath(self, start_point, end_point, tool=None, pattern="auto", deviation=None):
+        """
+        Return the toolpath for an area from the cache, planning it on a miss.
+        Args:
+            start_point (tuple): Starting (x, y) coordinate in meters
+            end_point (tuple): Ending (x, y) coordinate in meters
+            tool (int): Tool number whose width, stepover and speed limits are used, None for default_tool
+            pattern (str): Raster pattern from trajectory_planner.RASTER_PATTERNS, or "auto" to
+                use the pattern with the lowest estimated cycle time
+            deviation (float): Corner deviation the path runs with, None for stop-and-go. The "auto"
+                pattern is chosen for this execution mode, see trajectory_planner.path_cost
+        Returns:
+            np.ndarray: (N, 6) array of corner points
+        """
+        spec = self.tool_spec(tool)
+        key = self.toolpath_cache.make_key(
+            start_point, end_point,
+            tool=tool,
+            tool_width=spec.width,
+            stepover=spec.stepover,
+            component_height=self.component_height,
+            acceleration=spec.acceleration,
+            velocity=spec.feed_rate,
+            pattern=pattern,
+            deviation=deviation if pattern == "auto" else None
+        )
+        trajectory = self.toolpath_cache.get(key)
+        if trajectory is None:
+            if pattern == "auto":
+                pattern, trajectory, costs = plan_raster(
+                    start_point, end_point,
+                    component_height=self.component_height,
+                    tool_width=spec.width,
+                    velocity=spec.feed_rate,
+                    acceleration=spec.acceleration,
+                    corner_time=self.motion_stats["command_overhead"],
+                    stepover=spec.stepover,
+                    deviation=deviation
+                )
+                print(f"Raster pattern: {pattern} (estimated {costs[pattern]['time']:.1f} s, "
+                      f"{costs[pattern]['corners']} segments)")
+            else:
+                trajectory = generate_pattern(pattern, start_point, end_point, self.component_height, spec.width,
+                                              stepover=spec.stepover)
+            trajectory = self.toolpath_cache.put(key, trajectory)
+        return trajectory
+
+    def generate_trajectory_path(self, start_point, end_point, component_height, tool_width, stepover=None,
+                                 overlap=None, verbose=False):
         """
         Generate corner points for TCP movement over a rectangular area in a diagonal spiral pattern.
         Args:
@@ -411,70 +1130,20 @@ class RobotMovements:
             end_point (tuple): Ending (x, y) coordinate in meters
             component_height (float): Height of component in meters
             tool_width (float): Width of tool in meters
+            stepover (float): Stepover as a fraction of the tool width (default 0.5)
+            overlap (float): Overlap as a fraction of the tool width, alternative to stepover
+            verbose (bool): Print the generated corner points
         Returns:
-            list: List of tuples containing (x,y,z,rx,ry,rz) coordinates for each corner point
-        """
-        corner_points = []
-        # Fixed rotation values
-        rx = 2.188
-        ry = 2.188
-        rz = 0
-        z = self.component_height  # Fixed height
-        
-        # Initialize boundaries
-        left_y = start_point[1]
-        right_y = end_point[1]
-        bottom_x = start_point[0]
-        top_x = end_point[0]
-
-        # start from bottom-left corner
-        a1_x = bottom_x - tool_width / 2
-        a1_y = left_y + tool_width / 2
-        corner_points.append((a1_x, a1_y, z, rx, ry, rz))
-        
-        # next bottom right corner
-        a2_x = bottom_x - tool_width / 2
-        a2_y = right_y - tool_width / 2
-        corner_points.append((a2_x, a2_y, z, rx, ry, rz))
-        
-        # next top right corner
-        a3_x = top_x + tool_width / 2
-        a3_y = right_y - tool_width / 2
-        corner_points.append((a3_x, a3_y, z, rx, ry, rz))
-        
-        # next top left corner
-        a4_x = top_x + tool_width / 2
-        a4_y = left_y + tool_width / 2
-        corner_points.append((a4_x, a4_y, z, rx, ry, rz))
-        
-        # next bottom left corner
-        a5_x = bottom_x - tool_width
-        a5_y = left_y + tool_width / 2
-        corner_points.append((a5_x, a5_y, z, rx, ry, rz))
-
-        current_y = a5_y
-        next_y = a5_y
-        counter = 0
-        
-        while current_y >= right_y + tool_width:
-            if counter % 2 == 0:
-                # Moving towards top_x
-                next_x = top_x + tool_width / 2
-            else:
-                # Moving towards bottom_x
-                next_x = bottom_x - tool_width / 2
-                
-            next_y = current_y - tool_width / 2
-            corner_points.append((next_x, next_y, z, rx, ry, rz))
-            current_y = next_y
-            counter += 1
-
-        print("\nTrajectory Corner Points:")
-        print("------------------------")
-        for i, point in enumerate(corner_points):
-            print(f"Point {i+1:2d}: x={point[0]:7.3f}, y={point[1]:7.3f}, z={point[2]:7.3f}, rx={point[3]:7.3f}, ry={point[4]:7.3f}, rz={point[5]:7.3f}")
-        print("------------------------\n")
-
+            np.ndarray: (N, 6) array of (x,y,z,rx,ry,rz) coordinates for each corner point
+        """
+        corner_points = generate_raster_path(
+            start_point=start_point,
+            end_point=end_point,
+            component_height=component_height,
+            tool_width=tool_width,
+            stepover=stepover,
+            overlap=overlap
+        )
+        if verbose:
+            print_path(corner_points)
         return corner_points
-
-
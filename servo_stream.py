@@ -0,0 +1,221 @@
+"""Streaming execution of toolpaths through the realtime interface at a fixed setpoint rate"""
+
+import math
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+def junction_speed(direction_in, direction_out, acceleration, deviation, max_speed):
+    """
+    Highest speed at which the tool can pass a corner without leaving the path by more than deviation.
+
+    The corner is treated as a circular arc tangent to both segments that stays within deviation
+    of the corner point, the speed is limited by the centripetal acceleration on that arc.
+    """
+    cos_theta = -float(np.dot(direction_in, direction_out))
+    if cos_theta > 0.999999:
+        # Reversal, the tool has to stop
+        return 0.0
+    if cos_theta < -0.999999:
+        # Straight continuation
+        return max_speed
+    sin_half = math.sqrt(0.5 * (1.0 - cos_theta))
+    radius = deviation * sin_half / (1.0 - sin_half)
+    return min(max_speed, math.sqrt(acceleration * radius))
+
+
+def plan_feed_profile(poses, feed_rate, acceleration, deviation=0.0005):
+    """
+    Lookahead over the whole path: speed at every pose for constant feed rate with bounded acceleration.
+
+    Corner speeds are limited by junction_speed, a backward pass makes sure the tool can always
+    decelerate in time for the next corner and a forward pass limits what it can reach after the last one.
+    Args:
+        poses (array_like): (N, 6) path poses, consecutive duplicates are removed
+        feed_rate (float): Tool speed along the path in m/s
+        acceleration (float): Tool acceleration in m/s^2
+        deviation (float): Allowed distance between path and corner point in meters
+    Returns:
+        tuple: (poses, lengths, speeds) with (M, 6) poses, (M - 1,) segment lengths and (M,) pose speeds
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 6)
+    if len(poses) > 1:
+        keep = np.ones(len(poses), dtype=bool)
+        keep[1:] = np.linalg.norm(np.diff(poses[:, :3], axis=0), axis=1) > 1e-9
+        poses = poses[keep]
+    steps = np.diff(poses[:, :3], axis=0)
+    lengths = np.linalg.norm(steps, axis=1)
+    directions = steps / lengths[:, None] if len(lengths) else steps
+
+    speeds = np.zeros(len(poses))
+    for i in range(1, len(poses) - 1):
+        speeds[i] = junction_speed(directions[i - 1], directions[i], acceleration, deviation, feed_rate)
+
+    # Backward pass: reach every corner slow enough, forward pass: never faster than reachable
+    for i in range(len(lengths) - 1, -1, -1):
+        speeds[i] = min(speeds[i], math.sqrt(speeds[i + 1] ** 2 + 2 * acceleration * lengths[i]))
+    for i in range(len(lengths)):
+        speeds[i + 1] = min(speeds[i + 1], math.sqrt(speeds[i] ** 2 + 2 * acceleration * lengths[i]))
+    return poses, lengths, speeds
+
+
+def segment_profile(length, entry_speed, exit_speed, feed_rate, acceleration):
+    """
+    Trapezoidal speed profile of one segment.
+    Returns:
+        tuple: (peak_speed, acceleration_time, cruise_time, deceleration_time)
+    """
+    peak = math.sqrt((2 * acceleration * length + entry_speed ** 2 + exit_speed ** 2) / 2)
+    peak = max(min(feed_rate, peak), entry_speed, exit_speed)
+    acceleration_distance = (peak ** 2 - entry_speed ** 2) / (2 * acceleration)
+    deceleration_distance = (peak ** 2 - exit_speed ** 2) / (2 * acceleration)
+    cruise_distance = max(0.0, length - acceleration_distance - deceleration_distance)
+    cruise_time = cruise_distance / peak if peak > 0 else 0.0
+    return peak, (peak - entry_speed) / acceleration, cruise_time, (peak - exit_speed) / acceleration
+
+
+def path_duration(poses, feed_rate, acceleration, deviation=0.0005):
+    """Time the streamed path takes in seconds"""
+    poses, lengths, speeds = plan_feed_profile(poses, feed_rate, acceleration, deviation)
+    return sum(sum(segment_profile(length, speeds[i], speeds[i + 1], feed_rate, acceleration)[1:])
+               for i, length in enumerate(lengths))
+
+
+def sample_path(poses, feed_rate, acceleration, rate=125, deviation=0.0005):
+    """
+    Generate setpoints along the path at a fixed rate with constant feed rate between corners.
+
+    Positions follow the lookahead speed profile of plan_feed_profile, the orientation is
+    interpolated linearly along each segment. The last setpoint is the last pose of the path.
+    Args:
+        poses (array_like): (N, 6) path poses
+        feed_rate (float): Tool speed along the path in m/s
+        acceleration (float): Tool acceleration in m/s^2
+        rate (float): Setpoints per second, e.g. 125 or 500
+        deviation (float): Allowed corner deviation in meters
+    Yields:
+        tuple: (x, y, z, rx, ry, rz) setpoint
+    """
+    poses, lengths, speeds = plan_feed_profile(poses, feed_rate, acceleration, deviation)
+    period = 1.0 / rate
+    offset = 0.0  # Time into the current segment of its first setpoint
+    for i, length in enumerate(lengths):
+        v0 = speeds[i]
+        v1 = speeds[i + 1]
+        peak, t_acc, t_cruise, t_dec = segment_profile(length, v0, v1, feed_rate, acceleration)
+        duration = t_acc + t_cruise + t_dec
+
+        t = np.arange(offset, duration, period)
+        t_acc_part = np.minimum(t, t_acc)
+        t_cruise_part = np.clip(t - t_acc, 0.0, t_cruise)
+        t_dec_part = np.clip(t - t_acc - t_cruise, 0.0, t_dec)
+        distance = (v0 * t_acc_part + 0.5 * acceleration * t_acc_part ** 2 + peak * t_cruise_part
+                    + peak * t_dec_part - 0.5 * acceleration * t_dec_part ** 2)
+        fraction = np.clip(distance / length, 0.0, 1.0)
+
+        setpoints = poses[i] + fraction[:, None] * (poses[i + 1] - poses[i])
+        for setpoint in setpoints:
+            yield tuple(float(value) for value in setpoint)
+        offset = (t[-1] + period - duration) if len(t) else (offset - duration)
+    if len(poses):
+        yield tuple(float(value) for value in poses[-1])
+
+
+class SetpointStreamer:
+    """
+    Sends setpoints at a fixed rate while a producer thread keeps a lookahead buffer filled.
+
+    Setpoints are generated ahead of time into a bounded queue, so generating them never delays
+    a send. Sending is paced against absolute deadlines, so late cycles do not accumulate drift.
+    """
+
+    def __init__(self, send, rate=125, lookahead=0.2):
+        """
+        Args:
+            send (callable): Called with every setpoint, e.g. RobotBackend.set_realtime_pose
+            rate (float): Setpoints per second
+            lookahead (float): Seconds of setpoints buffered ahead of the controller
+        """
+        self.send = send
+        self.rate = rate
+        self.buffer_size = max(1, int(round(lookahead * rate)))
+        self.stats = {"setpoints": 0, "underruns": 0, "late_cycles": 0, "duration": 0.0, "cancelled": False}
+
+    def stream(self, setpoints, cancelled=None):
+        """
+        Stream all setpoints of an iterable.
+        Args:
+            setpoints (iterable): Setpoints in order, e.g. from sample_path
+            cancelled (callable): Polled every cycle, streaming stops as soon as it returns True
+        Returns:
+            dict: Stream statistics, "cancelled" is True if the stream was stopped early
+        """
+        buffer = queue.Queue(maxsize=self.buffer_size)
+        finished = threading.Event()
+        stopped = threading.Event()
+        errors = []
+
+        def put(item):
+            # Give up when the consumer stopped, otherwise a full buffer would block forever
+            while not stopped.is_set():
+                try:
+                    buffer.put(item, timeout=0.01)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for setpoint in setpoints:
+                    if not put(setpoint):
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                finished.set()
+                put(None)
+
+        producer = threading.Thread(target=produce, name="setpoint-producer", daemon=True)
+        producer.start()
+        # Let the generator get ahead before the first setpoint is sent
+        while not buffer.full() and not finished.is_set():
+            time.sleep(0.0005)
+
+        stats = {"setpoints": 0, "underruns": 0, "late_cycles": 0, "duration": 0.0, "cancelled": False}
+        period = 1.0 / self.rate
+        start_time = time.perf_counter()
+        deadline = start_time
+        while True:
+            if cancelled is not None and cancelled():
+                stats["cancelled"] = True
+                break
+            try:
+                setpoint = buffer.get_nowait()
+            except queue.Empty:
+                # Generator fell behind, the controller keeps the last setpoint for this cycle
+                stats["underruns"] += 1
+                setpoint = False
+            if setpoint is None:
+                break
+            if setpoint is not False:
+                self.send(setpoint)
+                stats["setpoints"] += 1
+
+            deadline += period
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            else:
+                stats["late_cycles"] += 1
+
+        stopped.set()
+        producer.join()
+        stats["duration"] = time.perf_counter() - start_time
+        self.stats = stats
+        if errors:
+            raise errors[0]
+        return stats
@@ -0,0 +1,155 @@
+"""Background recording of the actual robot state while toolpaths are executed"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+
+class TelemetryRecorder:
+    """
+    Samples TCP pose, joint positions and TCP speed at a fixed rate into a preallocated ring buffer.
+
+    Sampling runs on its own thread and writes into fixed NumPy arrays, so recording neither
+    allocates per sample nor runs on the motion thread. Jobs are marked with begin_job and written
+    with flush_job to one compressed .npz file each, on a separate writer thread that stop waits for.
+    """
+
+    def __init__(self, read_state, rate=500, capacity=75000, directory="telemetry"):
+        """
+        Args:
+            read_state (callable): Returns (tcp_pose, joint_positions, tcp_speed) of the robot,
+                e.g. RobotBackend.read_state
+            rate (float): Samples per second, the RTDE rate of the controller (500 for the UR3e, 125 for CB3)
+            capacity (int): Number of samples kept, older samples are overwritten
+            directory (str): Where flush_job writes its files
+        """
+        self.read_state = read_state
+        self.rate = rate
+        self.capacity = capacity
+        self.directory = directory
+        self.timestamps = np.zeros(capacity)
+        self.tcp_pose = np.zeros((capacity, 6))
+        self.joints = np.zeros((capacity, 6))
+        self.tcp_speed = np.zeros((capacity, 6))
+        self.count = 0  # Samples recorded since start, the ring index is count % capacity
+        self.missed_samples = 0
+        self.read_errors = 0
+        self.write_errors = 0
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+        self._writers = []
+        self._job_start = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for pending files to be written"""
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for writer in self._writers:
+            writer.join()
+        self._writers = []
+
+    def _run(self):
+        period = 1.0 / self.rate
+        deadline = time.perf_counter()
+        while self._running.is_set():
+            try:
+                pose, joints, speed = self.read_state()
+            except Exception:
+                self.read_errors += 1
+            else:
+                with self._lock:
+                    i = self.count % self.capacity
+                    self.timestamps[i] = time.perf_counter()
+                    self.tcp_pose[i] = pose
+                    self.joints[i] = joints
+                    self.tcp_speed[i] = speed
+                    self.count += 1
+
+            deadline += period
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            else:
+                # Behind schedule, skip the missed samples instead of sampling in a burst
+                behind = int(-remaining // period)
+                self.missed_samples += behind
+                deadline += behind * period
+
+    def begin_job(self):
+        """Mark the start of a job, the samples from here on belong to it"""
+        with self._lock:
+            self._job_start = self.count
+
+    def samples(self, start=None):
+        """
+        Copy of the recorded samples in chronological order.
+        Args:
+            start (int): Sample count to start from, defaults to the oldest sample in the buffer
+        Returns:
+            dict: "timestamp", "tcp_pose", "joints" and "tcp_speed" arrays
+        """
+        with self._lock:
+            end = self.count
+            oldest = max(0, end - self.capacity)
+            start = oldest if start is None else max(start, oldest)
+            indices = np.arange(start, end) % self.capacity
+            return {
+                "timestamp": self.timestamps[indices],
+                "tcp_pose": self.tcp_pose[indices],
+                "joints": self.joints[indices],
+                "tcp_speed": self.tcp_speed[indices],
+            }
+
+    def flush_job(self, name, planned_path=None, **metadata):
+        """
+        Write the samples since begin_job to <directory>/<name>.npz in the background.
+        Args:
+            name (str): File name without extension
+            planned_path (array_like): (N, 6) planned corner points, stored for comparison
+            metadata: Additional scalar values stored with the samples, e.g. the tool number
+        Returns:
+            str: Path of the file
+        """
+        start = self._job_start
+        self._job_start = None
+        columns = self.samples(start)
+        if start is not None and start < self.count - self.capacity:
+            print(f"Telemetry buffer too small for job {name}, the first samples were overwritten")
+        if planned_path is not None:
+            columns["planned_path"] = np.asarray(planned_path, dtype=float)
+        for key, value in metadata.items():
+            columns[key] = np.asarray(value if value is not None else np.nan)
+        columns["rate"] = np.asarray(self.rate)
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}.npz")
+        # Not a daemon, a file that is still being written is finished before the interpreter exits
+        writer = threading.Thread(target=self._write, args=(path, columns), name=f"telemetry-{name}")
+        writer.start()
+        self._writers = [thread for thread in self._writers if thread.is_alive()] + [writer]
+        return path
+
+    def _write(self, path, columns):
+        try:
+            np.savez_compressed(path, **columns)
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Error writing telemetry to {path}: {str(e)}")
+
+
+def load_job(path):
+    """Load a file written by TelemetryRecorder.flush_job into a dict of arrays"""
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
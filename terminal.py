@@ -12,6 +12,7 @@ from queue import Queue
 class UserInterface:
     def __init__(self, robot):
         self.robot = robot
+        self.TOOLS = {tool.name: tool.number for tool in robot.tools}
         self.traj_start_x = 0
         self.traj_start_y = 0
         self.traj_end_x = 0
@@ -65,14 +66,14 @@ class UserInterface:
         
         self.selected_row_start = tk.StringVar()
         self.row_dropdown_start = ttk.Combobox(self.work_frame_start, textvariable=self.selected_row_start)
-        self.row_dropdown_start['values'] = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
+        self.row_dropdown_start['values'] = self.robot.work_grid.column_labels
         self.row_dropdown_start['state'] = 'readonly'
         self.row_dropdown_start.set('Select Row')
         self.row_dropdown_start.pack(pady=5)
         
         self.selected_col_start = tk.StringVar()
         self.col_dropdown_start = ttk.Combobox(self.work_frame_start, textvariable=self.selected_col_start)
-        self.col_dropdown_start['values'] = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10']
+        self.col_dropdown_start['values'] = self.robot.work_grid.row_labels
         self.col_dropdown_start['state'] = 'readonly'
         self.col_dropdown_start.set('Select Column')
         self.col_dropdown_start.pack(pady=5)
@@ -84,14 +85,14 @@ class UserInterface:
         
         self.selected_row_end = tk.StringVar()
         self.row_dropdown_end = ttk.Combobox(self.work_frame_end, textvariable=self.selected_row_end)
-        self.row_dropdown_end['values'] = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
+        self.row_dropdown_end['values'] = self.robot.work_grid.column_labels
         self.row_dropdown_end['state'] = 'readonly'
         self.row_dropdown_end.set('Select Row')
         self.row_dropdown_end.pack(pady=5)
         
         self.selected_col_end = tk.StringVar()
         self.col_dropdown_end = ttk.Combobox(self.work_frame_end, textvariable=self.selected_col_end)
-        self.col_dropdown_end['values'] = ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10']
+        self.col_dropdown_end['values'] = self.robot.work_grid.row_labels
         self.col_dropdown_end['state'] = 'readonly'
         self.col_dropdown_end.set('Select Column')
         self.col_dropdown_end.pack(pady=5)
@@ -113,7 +114,7 @@ class UserInterface:
         # Tool dropdown
         self.selected_tool = tk.StringVar()
         self.tool_dropdown = ttk.Combobox(self.tool_frame, textvariable=self.selected_tool)
-        self.tool_dropdown['values'] = ['Tool 1', 'Tool 2', 'Tool 3']
+        self.tool_dropdown['values'] = list(self.TOOLS)
         self.tool_dropdown['state'] = 'readonly'
         self.tool_dropdown.set('Select Tool')
         self.tool_dropdown.pack(pady=10)
@@ -142,13 +143,42 @@ class UserInterface:
                                     activebackground='green')
         self.start_button.pack(side=tk.LEFT, padx=10)
 
+        # Job queue buttons: collect several areas and grind them back to back
+        self.add_job_button = tk.Button(self.button_frame, text="Add to Queue",
+                                        command=self.add_job,
+                                        font=('Arial', 14, 'bold'),
+                                        width=15, height=2)
+        self.add_job_button.pack(side=tk.LEFT, padx=10)
+
+        self.run_queue_button = tk.Button(self.button_frame, text="Run Queue (0)",
+                                          command=self.run_queue,
+                                          font=('Arial', 14, 'bold'),
+                                          width=15, height=2)
+        self.run_queue_button.pack(side=tk.LEFT, padx=10)
+
         # Stop button (Red with black text)
-        
+        self.stop_button = tk.Button(self.button_frame, text="Stop",
+                                     command=self.stop_process,
+                                     bg='red', fg='black',
+                                     font=('Arial', 14, 'bold'),
+                                     width=15, height=2,
+                                     relief='raised',
+                                     highlightbackground='red',
+                                     activebackground='dark red')
+        self.stop_button.pack(side=tk.LEFT, padx=10)
+
+        self.resume_button = tk.Button(self.button_frame, text="Resume",
+                                       command=self.resume_process,
+                                       font=('Arial', 14, 'bold'),
+                                       width=15, height=2,
+                                       state='disabled')
+        self.resume_button.pack(side=tk.LEFT, padx=10)
+
         # Initialize other variables
         self.movement_active = False
         self.corner_color = (0, 255, 0)
-        self.rows = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J']
-        self.cols = [str(i) for i in range(1, 11)]
+        self.rows = self.robot.work_grid.column_labels
+        self.cols = self.robot.work_grid.row_labels
         self.update_frame()
         
     def start_process(self):
@@ -156,62 +186,54 @@ class UserInterface:
         print("Process started")
         current_tool = self.selected_tool.get()
         
-        if current_tool == "Tool 1":
+        if current_tool in self.TOOLS:
             print("Performing get tool movement...")
-            if self.current_tool is not None:
-                drop_thread = threading.Thread(target=self.robot.drop_tool, args=(self.current_tool,))
-                drop_thread.start()
-                drop_thread.join()
-                self.current_position = "drop_tool"
-                self.current_tool = None
-                
-            tool_choice = 1
-            get_thread = threading.Thread(target=self.robot.get_tool, args=(tool_choice, 0.1))
-            get_thread.start() 
-            get_thread.join()
+            tool_choice = self.TOOLS[current_tool]
+            self.robot.swap_tool(self.current_tool, tool_choice)
             self.current_position = "get_tool"
             self.current_tool = tool_choice
 
-        elif current_tool == "Tool 2":
-            print("Performing get tool movement...")
-            if self.current_tool is not None:
-                drop_thread = threading.Thread(target=self.robot.drop_tool, args=(self.current_tool,))
-                drop_thread.start()
-                drop_thread.join()
-                self.current_position = "drop_tool"
-                self.current_tool = None
+        # Queued behind the tool change on the motion worker
+        trajectory = self.robot.perform_trajectory(self.traj_start_x, self.traj_start_y,
+                                                   self.traj_end_x, self.traj_end_y)
+        trajectory.add_done_callback(self.motion_done)
 
-            tool_choice = 2
-            get_thread = threading.Thread(target=self.robot.get_tool, args=(tool_choice, 0.1))
-            get_thread.start()
-            get_thread.join()
-            self.current_position = "get_tool"
-            self.current_tool = tool_choice
-
-        elif current_tool == "Tool 3":
-            print("Performing get tool movement...")
-            if self.current_tool is not None:
-                drop_thread = threading.Thread(target=self.robot.drop_tool, args=(self.current_tool,))
-                drop_thread.start()
-                drop_thread.join()
-                self.current_position = "drop_tool"
-                self.current_tool = None
-                
-            tool_choice = 3
-            get_thread = threading.Thread(target=self.robot.get_tool, args=(tool_choice, 0.1))
-            get_thread.start()
-            get_thread.join()
-            self.current_position = "get_tool"
-            self.current_tool = tool_choice
+    def add_job(self):
+        """Queue the confirmed work area with the selected tool"""
+        current_tool = self.selected_tool.get()
+        if current_tool not in self.TOOLS or not hasattr(self, 'selected_area'):
+            print("Please confirm a work area and select a tool")
+            return
+        self.robot.job_queue.add(self.traj_start_x, self.traj_start_y,
+                                 self.traj_end_x, self.traj_end_y, self.TOOLS[current_tool])
+        print(f"Job added, {len(self.robot.job_queue)} jobs queued")
+        self.run_queue_button.config(text=f"Run Queue ({len(self.robot.job_queue)})")
+        self.enable_start_button()
 
-        traj_thread = threading.Thread(target=self.run_trajectory)
-        traj_thread.start()
+    def run_queue(self):
+        if len(self.robot.job_queue) == 0:
+            print("Job queue is empty")
+            return
+        self.start_button.config(state='disabled', bg='grey')
+        self.run_queue_button.config(state='disabled')
+        self.robot.run_jobs().add_done_callback(self.motion_done)
 
-    def run_trajectory(self):
-        self.robot.perform_trajectory(self.traj_start_x, self.traj_start_y,
-                                    self.traj_end_x, self.traj_end_y)
+    def motion_done(self, future):
+        """Called on the motion worker when a queued trajectory or job run has finished or was stopped"""
+        self.current_tool = self.robot.current_tool
         self.window.after(0, self.enable_start_button)
 
+    def stop_process(self):
+        """Stop the robot right away, the interrupted trajectory can be resumed"""
+        print("Stopping process")
+        self.robot.cancel_motion().add_done_callback(self.motion_done)
+
+    def resume_process(self):
+        self.start_button.config(state='disabled', bg='grey')
+        self.run_queue_button.config(state='disabled')
+        self.resume_button.config(state='disabled')
+        self.robot.resume_trajectory().add_done_callback(self.motion_done)
+
     def enable_start_button(self):
                 # Reset all dropdowns
         self.row_dropdown_start.set('Select Row')
@@ -224,6 +246,8 @@ class UserInterface:
         if hasattr(self, 'selected_area'):
             delattr(self, 'selected_area')
         self.start_button.config(state='normal', bg='lime green') 
+        self.run_queue_button.config(state='normal', text=f"Run Queue ({len(self.robot.job_queue)})")
+        self.resume_button.config(state='normal' if self.robot.interrupted_trajectory else 'disabled')
 
         
     def confirm(self):
@@ -237,11 +261,8 @@ class UserInterface:
             print("Please select both start and end points")
             return
         
-        pose_name_start = f"{start_row}{start_col}"
-        pose_start = getattr(self.robot, pose_name_start)
-
-        pose_name_end = f"{end_row}{end_col}"
-        pose_end = getattr(self.robot, pose_name_end)
+        pose_start = self.robot.work_grid.pose(f"{start_row}{start_col}")
+        pose_end = self.robot.work_grid.pose(f"{end_row}{end_col}")
 
     
         """Trajectory points"""
@@ -273,8 +294,8 @@ class UserInterface:
         
     def draw_grid(self, frame):
         height, width = frame.shape[:2]
-        cell_height = height // 10
-        cell_width = width // 10
+        cell_height = height // len(self.rows)
+        cell_width = width // len(self.cols)
         
         # Draw the blue rectangle if area is selected
         if hasattr(self, 'selected_area'):
@@ -292,11 +313,11 @@ class UserInterface:
             frame = cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0)
         
         # Draw grid lines
-        for i in range(1, 10):
+        for i in range(1, len(self.cols)):
             x = i * cell_width
             cv2.line(frame, (x, 0), (x, height), (255, 255, 255), 1)
             
-        for i in range(1, 10):
+        for i in range(1, len(self.rows)):
             y = i * cell_height
             cv2.line(frame, (0, y), (width, y), (255, 255, 255), 1)
         
@@ -304,13 +325,13 @@ class UserInterface:
         font_scale = 0.4
         
         # Draw corner points and labels
-        for i in range(11):
-            for j in range(11):
+        for i in range(len(self.rows) + 1):
+            for j in range(len(self.cols) + 1):
                 x = j * cell_width
                 y = height - i * cell_height  # Invert Y coordinate
                 cv2.circle(frame, (x, y), 3, self.corner_color, -1)
                 
-                if i < 10 and j < 10:
+                if i < len(self.rows) and j < len(self.cols):
                     label = f"{self.rows[i]}{self.cols[j]}"
                     cv2.putText(frame, label, (x + 5, y - 5), 
                               font, font_scale, (0, 0, 0), 1)
@@ -1,10 +1,12 @@
+import argparse
 from robot_movements import RobotMovements
 from terminal import UserInterface
 from robotiq_gripper import RobotiqGripper
+from robot_backend import SimulatedRobot
 
 
 class RobotTerminalController:
-    def __init__(self):
+    def __init__(self, backend=None, telemetry_dir=None, metrics_file=None):
 
         """Base Initialization"""
         self.robot_ip = '192.168.56.101'
@@ -22,7 +24,11 @@ class RobotTerminalController:
             robot_ip=self.robot_ip,
             #gripper=self.gripper,
             acceleration=0.7,
-            velocity=0.7
+            velocity=0.7,
+            backend=backend,
+            lazy=True,
+            telemetry_dir=telemetry_dir,
+            metrics_file=metrics_file
         )
         self.current_position = "start"
         self.timer_running = False
@@ -37,9 +43,19 @@ class RobotTerminalController:
             self.user_interface.run()
         finally:
             self.user_interface.cleanup()
+            # Also waits for the telemetry of the last job to be written
+            self.robot.close()
 
 def main():
-    controller = RobotTerminalController()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--simulate", action="store_true", help="Use the simulated robot instead of the UR3e")
+    parser.add_argument("--latency", type=float, default=0.0, help="Command latency of the simulated robot in seconds")
+    parser.add_argument("--telemetry", metavar="DIR", help="Record the robot state of every job into DIR")
+    parser.add_argument("--metrics", metavar="FILE", help="Export motion timing histograms to FILE (Prometheus text format)")
+    args = parser.parse_args()
+
+    backend = SimulatedRobot(command_latency=args.latency) if args.simulate else None
+    controller = RobotTerminalController(backend=backend, telemetry_dir=args.telemetry, metrics_file=args.metrics)
     controller.run()
 
 if __name__ == "__main__":
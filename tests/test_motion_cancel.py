@@ -0,0 +1,44 @@
+"""Cancelling a motion while it is being sent to the simulated robot"""
+
+import math
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from robot_backend import SimulatedRobot  # noqa: E402
+from robot_movements import RobotMovements  # noqa: E402
+
+
+def test_cancel_during_send_stops_the_sent_motion():
+    robot = SimulatedRobot(command_latency=0.05, time_scale=0.0)
+    movements = RobotMovements("simulated", backend=robot)
+    movements.wait_until_ready()
+    # From here on motions take their real time, a base turn of 90 degrees takes well over a second
+    robot.time_scale = 1.0
+    target = list(movements.ROBOT_WAIT_FOR_INPUT_POSE)
+    target[0] += math.radians(90)
+
+    sending = threading.Event()
+    movej = robot.movej
+
+    def slow_movej(*args, **kwargs):
+        # The cancel arrives after the command was dequeued, while the motion is still on its way
+        sending.set()
+        time.sleep(0.2)
+        movej(*args, **kwargs)
+
+    robot.movej = slow_movej
+    try:
+        moved = movements.move_to_jpose(tuple(target))
+        assert sending.wait(2.0)
+        movements.cancel_motion(retract=False).result(timeout=5.0)
+        assert moved.result(timeout=5.0) is False
+        stopped_at = robot.get_actual_joint_positions()
+        assert abs(stopped_at[0] - target[0]) > math.radians(10)
+        assert robot.command_counts["stopl"] >= 1
+    finally:
+        robot.movej = movej
+        movements.close()
@@ -0,0 +1,83 @@
+"""Grinding tools with their geometry, rack slot and process limits"""
+
+
+class Tool:
+    """One grinding tool and the parameters its toolpaths are planned and run with"""
+
+    def __init__(self, number, name, width, rack_pose=None, hover_height=0.25, stepover=0.5,
+                 feed_rate=0.5, acceleration=0.5):
+        """
+        Args:
+            number (int): Rack slot, also the number used by the user interfaces
+            name (str): Display name
+            width (float): Width of the tool in meters
+            rack_pose (tuple): (x, y, z, rx, ry, rz) TCP pose to grip the tool in its slot,
+                None for a tool without rack slot
+            hover_height (float): z of the pose above the slot in meters
+            stepover (float): Distance between raster passes as a fraction of the width
+            feed_rate (float): Maximum TCP speed while grinding in m/s
+            acceleration (float): Maximum TCP acceleration while grinding in m/s^2
+        """
+        self.number = number
+        self.name = name
+        self.width = width
+        self.stepover = stepover
+        self.feed_rate = feed_rate
+        self.acceleration = acceleration
+        self.pick_up_pose = tuple(rack_pose) if rack_pose is not None else None
+        self.hover_pose = ((*self.pick_up_pose[:2], hover_height, *self.pick_up_pose[3:6])
+                           if rack_pose is not None else None)
+
+    def __repr__(self):
+        return (f"Tool({self.number}, {self.name!r}, width={self.width}, stepover={self.stepover}, "
+                f"feed_rate={self.feed_rate}, acceleration={self.acceleration})")
+
+
+class ToolRegistry:
+    """Tools by number, in rack order"""
+
+    def __init__(self, tools=()):
+        self._tools = {}
+        for tool in tools:
+            self.register(tool)
+
+    def register(self, tool):
+        """Add a tool, replacing a registered tool with the same number"""
+        self._tools[tool.number] = tool
+        self._tools = dict(sorted(self._tools.items()))
+        return tool
+
+    def get(self, number):
+        """Tool with the given number, raises ValueError for an unknown tool"""
+        try:
+            return self._tools[number]
+        except KeyError:
+            raise ValueError(f"Unknown tool: {number}") from None
+
+    def numbers(self):
+        return list(self._tools)
+
+    def __contains__(self, number):
+        return number in self._tools
+
+    def __iter__(self):
+        return iter(self._tools.values())
+
+    def __len__(self):
+        return len(self._tools)
+
+
+def default_tool_registry(pick_up_height=0.163, feed_rate=0.5, acceleration=0.5):
+    """
+    The three tools of the rack at the workcell.
+    Args:
+        pick_up_height (float): z of the rack poses in meters
+        feed_rate (float): Grinding speed of all tools in m/s, the robot speed the tools were used with so far
+        acceleration (float): Grinding acceleration of all tools in m/s^2
+    """
+    speeds = {"feed_rate": feed_rate, "acceleration": acceleration}
+    return ToolRegistry([
+        Tool(1, "Tool 1", width=0.03, rack_pose=(0.0247, 0.34, pick_up_height, 3.154, 0.094, 0.012), **speeds),
+        Tool(2, "Tool 2", width=0.03, rack_pose=(0.133, 0.34, pick_up_height, 3.151, 0.088, -0.032), **speeds),
+        Tool(3, "Tool 3", width=0.03, rack_pose=(0.233, 0.34, pick_up_height, 3.144, 0.007, -0.023), **speeds),
+    ])
@@ -0,0 +1,414 @@
+"""Vectorized generation of grinding toolpaths"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from servo_stream import path_duration
+
+# Fixed TCP rotation (rx, ry, rz) used while grinding
+GRINDING_ORIENTATION = (2.188, 2.188, 0.0)
+
+
+def stepover_distance(tool_width, stepover=None, overlap=None):
+    """
+    Distance between two neighbouring raster passes.
+    Args:
+        tool_width (float): Width of tool in meters
+        stepover (float): Stepover as a fraction of the tool width (0 < stepover <= 1)
+        overlap (float): Overlap of neighbouring passes as a fraction of the tool width,
+            alternative to stepover (stepover = 1 - overlap)
+    Returns:
+        float: Stepover in meters
+    """
+    if stepover is not None and overlap is not None:
+        raise ValueError("Specify either stepover or overlap, not both")
+    if overlap is not None:
+        stepover = 1.0 - overlap
+    if stepover is None:
+        stepover = 0.5
+    if not 0 < stepover <= 1:
+        raise ValueError(f"Stepover ratio must be in (0, 1], got {stepover}")
+    if tool_width <= 0:
+        raise ValueError(f"Tool width must be positive, got {tool_width}")
+    return tool_width * stepover
+
+
+def generate_raster_paths(areas, component_height, tool_width, stepover=None, overlap=None,
+                          orientation=GRINDING_ORIENTATION):
+    """
+    Generate the corner points for many rectangular areas in one call.
+
+    Every path starts with a perimeter pass around the area and then zig-zags between
+    bottom_x and top_x while stepping along y.
+    Args:
+        areas (array_like): (M, 4) array of [start_x, start_y, end_x, end_y] in meters
+        component_height (float): Height of component in meters
+        tool_width (float): Width of tool in meters
+        stepover (float): Stepover as a fraction of the tool width (default 0.5)
+        overlap (float): Overlap as a fraction of the tool width, alternative to stepover
+        orientation (tuple): (rx, ry, rz) of the TCP
+    Returns:
+        tuple: (points, offsets) where points is an (N, 6) float array of (x,y,z,rx,ry,rz) and
+            the path of area i is points[offsets[i]:offsets[i + 1]]
+    """
+    areas = np.asarray(areas, dtype=float).reshape(-1, 4)
+    step = stepover_distance(tool_width, stepover, overlap)
+    half = tool_width / 2
+
+    bottom_x = areas[:, 0]
+    left_y = areas[:, 1]
+    top_x = areas[:, 2]
+    right_y = areas[:, 3]
+
+    # Perimeter: bottom-left, bottom-right, top-right, top-left, back to bottom-left
+    perimeter_x = np.stack([bottom_x - half, bottom_x - half, top_x + half, top_x + half, bottom_x - tool_width], axis=1)
+    perimeter_y = np.stack([left_y + half, right_y - half, right_y - half, left_y + half, left_y + half], axis=1)
+
+    # Number of zig-zag passes until the far side is reached
+    start_y = left_y + half
+    span = start_y - (right_y + tool_width)
+    pass_counts = np.where(span >= 0, np.floor(span / step + 1e-9).astype(int) + 1, 0)
+
+    counts = 5 + pass_counts
+    offsets = np.zeros(len(areas) + 1, dtype=int)
+    np.cumsum(counts, out=offsets[1:])
+    points = np.empty((offsets[-1], 6), dtype=float)
+
+    # Index of every point within its own path
+    area_index = np.repeat(np.arange(len(areas)), counts)
+    local_index = np.arange(offsets[-1]) - offsets[area_index]
+    is_perimeter = local_index < 5
+
+    perimeter_rows = area_index[is_perimeter], local_index[is_perimeter]
+    points[is_perimeter, 0] = perimeter_x[perimeter_rows]
+    points[is_perimeter, 1] = perimeter_y[perimeter_rows]
+
+    pass_area = area_index[~is_perimeter]
+    pass_index = local_index[~is_perimeter] - 5
+    towards_top = pass_index % 2 == 0
+    points[~is_perimeter, 0] = np.where(towards_top, top_x[pass_area] + half, bottom_x[pass_area] - half)
+    points[~is_perimeter, 1] = start_y[pass_area] - (pass_index + 1) * step
+
+    points[:, 2] = component_height
+    points[:, 3:] = orientation
+    return points, offsets
+
+
+def generate_raster_path(start_point, end_point, component_height, tool_width, stepover=None, overlap=None,
+                         orientation=GRINDING_ORIENTATION):
+    """
+    Generate the corner points for a single rectangular area.
+    Args:
+        start_point (tuple): Starting (x, y) coordinate in meters
+        end_point (tuple): Ending (x, y) coordinate in meters
+        component_height (float): Height of component in meters
+        tool_width (float): Width of tool in meters
+        stepover (float): Stepover as a fraction of the tool width (default 0.5)
+        overlap (float): Overlap as a fraction of the tool width, alternative to stepover
+        orientation (tuple): (rx, ry, rz) of the TCP
+    Returns:
+        np.ndarray: (N, 6) array of (x,y,z,rx,ry,rz) corner points
+    """
+    area = (start_point[0], start_point[1], end_point[0], end_point[1])
+    points, _ = generate_raster_paths([area], component_height, tool_width, stepover, overlap, orientation)
+    return points
+
+
+def print_path(points):
+    """Print the corner points of a path as a table"""
+    print("\nTrajectory Corner Points:")
+    print("------------------------")
+    for i, point in enumerate(points):
+        print(f"Point {i+1:2d}: x={point[0]:7.3f}, y={point[1]:7.3f}, z={point[2]:7.3f}, rx={point[3]:7.3f}, ry={point[4]:7.3f}, rz={point[5]:7.3f}")
+    print("------------------------\n")
+
+
+class ToolpathCache:
+    """Bounded LRU cache of generated toolpaths"""
+
+    def __init__(self, maxsize=128, resolution=1e-4):
+        """
+        Args:
+            maxsize (int): Maximum number of cached toolpaths, the least recently used one is evicted first
+            resolution (float): Grid in meters that start and end points are rounded to before lookup
+        """
+        self.maxsize = maxsize
+        self.resolution = resolution
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, start_point, end_point, **parameters):
+        """Build a cache key from the quantized area and the process parameters"""
+        area = tuple(int(round(value / self.resolution)) for value in (*start_point[:2], *end_point[:2]))
+        return area + tuple(sorted(parameters.items()))
+
+    def get(self, key):
+        """Return the cached toolpath for key or None"""
+        with self._lock:
+            path = self._paths.get(key)
+            if path is None:
+                self.misses += 1
+                return None
+            self._paths.move_to_end(key)
+            self.hits += 1
+            return path
+
+    def put(self, key, path):
+        """Store a toolpath, the array is made read-only so cached paths cannot be modified"""
+        path = np.asarray(path)
+        path.setflags(write=False)
+        with self._lock:
+            self._paths[key] = path
+            self._paths.move_to_end(key)
+            while len(self._paths) > self.maxsize:
+                self._paths.popitem(last=False)
+                self.evictions += 1
+        return path
+
+    def clear(self):
+        with self._lock:
+            self._paths.clear()
+
+    def stats(self):
+        """Return hit/miss counters of the cache"""
+        with self._lock:
+            return {
+                "size": len(self._paths),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._paths)
+
+
+def closest_segment(points, position):
+    """Index i of the path segment points[i] -> points[i + 1] that is closest to position (x, y, z)"""
+    points = np.asarray(points, dtype=float)[:, :3]
+    if len(points) < 2:
+        return 0
+    start = points[:-1]
+    step = points[1:] - start
+    squared_length = np.maximum((step ** 2).sum(axis=1), 1e-18)
+    t = np.clip(((np.asarray(position[:3], dtype=float) - start) * step).sum(axis=1) / squared_length, 0.0, 1.0)
+    distances = np.linalg.norm(start + t[:, None] * step - position[:3], axis=1)
+    return int(np.argmin(distances))
+
+
+RASTER_PATTERNS = ("perimeter_fill", "zigzag_x", "zigzag_y", "spiral")
+
+
+def _pass_positions(start, end, step):
+    """Evenly spaced pass positions from start to end with a spacing of at most step"""
+    count = max(1, int(np.ceil(abs(end - start) / step - 1e-9))) + 1
+    return np.linspace(start, end, count)
+
+
+def _centerline_bounds(start_point, end_point, tool_width):
+    """Rectangle covered by the tool center, the area grown by half the tool width like the perimeter pass"""
+    half = tool_width / 2
+    x_lo, x_hi = sorted((start_point[0], end_point[0]))
+    y_lo, y_hi = sorted((start_point[1], end_point[1]))
+    # Start at the corner closest to start_point
+    x_from, x_to = (x_lo - half, x_hi + half) if start_point[0] <= end_point[0] else (x_hi + half, x_lo - half)
+    y_from, y_to = (y_lo - half, y_hi + half) if start_point[1] <= end_point[1] else (y_hi + half, y_lo - half)
+    return x_from, x_to, y_from, y_to
+
+
+def _with_pose(xy, component_height, orientation):
+    points = np.empty((len(xy), 6), dtype=float)
+    points[:, :2] = xy
+    points[:, 2] = component_height
+    points[:, 3:] = orientation
+    return points
+
+
+def generate_zigzag_path(start_point, end_point, component_height, tool_width, stepover=None, overlap=None,
+                         major_axis="x", orientation=GRINDING_ORIENTATION):
+    """
+    Zig-zag raster with passes parallel to one axis.
+    Args:
+        start_point (tuple): Starting (x, y) coordinate in meters
+        end_point (tuple): Ending (x, y) coordinate in meters
+        component_height (float): Height of component in meters
+        tool_width (float): Width of tool in meters
+        stepover (float): Stepover as a fraction of the tool width (default 0.5)
+        overlap (float): Overlap as a fraction of the tool width, alternative to stepover
+        major_axis (str): "x" for passes along x, "y" for passes along y
+        orientation (tuple): (rx, ry, rz) of the TCP
+    Returns:
+        np.ndarray: (N, 6) array of (x,y,z,rx,ry,rz) corner points
+    """
+    step = stepover_distance(tool_width, stepover, overlap)
+    x_from, x_to, y_from, y_to = _centerline_bounds(start_point, end_point, tool_width)
+    if major_axis == "x":
+        along_from, along_to, across = x_from, x_to, _pass_positions(y_from, y_to, step)
+    elif major_axis == "y":
+        along_from, along_to, across = y_from, y_to, _pass_positions(x_from, x_to, step)
+    else:
+        raise ValueError(f"Unknown major axis: {major_axis}")
+
+    # Every pass has two corner points, every second pass runs backwards
+    reverse = np.arange(len(across)) % 2 == 1
+    along = np.empty((len(across), 2))
+    along[:, 0] = np.where(reverse, along_to, along_from)
+    along[:, 1] = np.where(reverse, along_from, along_to)
+    xy = np.empty((2 * len(across), 2))
+    if major_axis == "x":
+        xy[:, 0] = along.ravel()
+        xy[:, 1] = np.repeat(across, 2)
+    else:
+        xy[:, 0] = np.repeat(across, 2)
+        xy[:, 1] = along.ravel()
+    return _with_pose(xy, component_height, orientation)
+
+
+def generate_spiral_path(start_point, end_point, component_height, tool_width, stepover=None, overlap=None,
+                         orientation=GRINDING_ORIENTATION):
+    """
+    Inward rectangular spiral starting at the corner closest to start_point.
+    Args:
+        start_point (tuple): Starting (x, y) coordinate in meters
+        end_point (tuple): Ending (x, y) coordinate in meters
+        component_height (float): Height of component in meters
+        tool_width (float): Width of tool in meters
+        stepover (float): Stepover as a fraction of the tool width (default 0.5)
+        overlap (float): Overlap as a fraction of the tool width, alternative to stepover
+        orientation (tuple): (rx, ry, rz) of the TCP
+    Returns:
+        np.ndarray: (N, 6) array of (x,y,z,rx,ry,rz) corner points
+    """
+    step = stepover_distance(tool_width, stepover, overlap)
+    x_from, x_to, y_from, y_to = _centerline_bounds(start_point, end_point, tool_width)
+    x_dir = 1.0 if x_to >= x_from else -1.0
+    y_dir = 1.0 if y_to >= y_from else -1.0
+    x_lo, x_hi = x_from, x_to
+    y_lo, y_hi = y_from, y_to
+
+    xy = [(x_lo, y_lo)]
+    while True:
+        # One ring: along x, along y, back along x, back along y to the next ring
+        if (x_hi - x_lo) * x_dir < 0 or (y_hi - y_lo) * y_dir < 0:
+            break
+        xy.append((x_hi, y_lo))
+        if (y_hi - y_lo) * y_dir <= 0:
+            break
+        xy.append((x_hi, y_hi))
+        if (x_hi - x_lo) * x_dir <= 0:
+            break
+        xy.append((x_lo, y_hi))
+        y_lo += step * y_dir
+        if (y_hi - y_lo) * y_dir < 0:
+            break
+        xy.append((x_lo, y_lo))
+        x_lo += step * x_dir
+        x_hi -= step * x_dir
+        y_hi -= step * y_dir
+        if (x_hi - x_lo) * x_dir < 0:
+            break
+        xy.append((x_lo, y_lo))
+
+    # Drop repeated points from rings that collapsed
+    xy = np.array(xy, dtype=float)
+    keep = np.ones(len(xy), dtype=bool)
+    keep[1:] = np.any(np.abs(np.diff(xy, axis=0)) > 1e-12, axis=1)
+    return _with_pose(xy[keep], component_height, orientation)
+
+
+def path_cost(points, velocity, acceleration, corner_time=0.0, deviation=None):
+    """
+    Estimated execution time of a path.
+    Args:
+        points (np.ndarray): (N, 6) corner points
+        velocity (float): Tool velocity in m/s
+        acceleration (float): Tool acceleration in m/s^2
+        corner_time (float): Additional time per corner point, e.g. the command overhead.
+            Only used for stop-and-go paths, a blended or streamed path is one command
+        deviation (float): None for a path that stops at every corner point. Otherwise the path runs
+            without stopping (blended or streamed) and may leave the corner by this distance in meters,
+            corners are then passed at the speed servo_stream.junction_speed allows
+    Returns:
+        dict: length, corners, accel_time (time lost to acceleration and braking) and total time
+    """
+    lengths = np.linalg.norm(np.diff(points[:, :3], axis=0), axis=1)
+    lengths = lengths[lengths > 0]
+    length = float(lengths.sum())
+    if deviation is not None:
+        motion_time = float(path_duration(points, velocity, acceleration, deviation))
+        return {
+            "length": length,
+            "corners": len(lengths),
+            "accel_time": motion_time - length / velocity,
+            "time": motion_time,
+        }
+
+    # Trapezoidal profile per segment, triangular when the cruise speed is not reached
+    triangular = lengths <= velocity ** 2 / acceleration
+    times = np.where(triangular, 2 * np.sqrt(lengths / acceleration), lengths / velocity + velocity / acceleration)
+    motion_time = float(times.sum())
+    return {
+        "length": length,
+        "corners": len(lengths),
+        "accel_time": motion_time - length / velocity,
+        "time": motion_time + len(lengths) * corner_time,
+    }
+
+
+def generate_pattern(pattern, start_point, end_point, component_height, tool_width, stepover=None, overlap=None,
+                     orientation=GRINDING_ORIENTATION):
+    """Generate the corner points of a named raster pattern, see RASTER_PATTERNS"""
+    if pattern == "perimeter_fill":
+        # The perimeter pass runs from (min x, max y) to (max x, min y)
+        xs = sorted((start_point[0], end_point[0]))
+        ys = sorted((start_point[1], end_point[1]))
+        return generate_raster_path((xs[0], ys[1]), (xs[1], ys[0]), component_height, tool_width, stepover, overlap,
+                                    orientation)
+    if pattern == "zigzag_x":
+        return generate_zigzag_path(start_point, end_point, component_height, tool_width, stepover, overlap,
+                                    "x", orientation)
+    if pattern == "zigzag_y":
+        return generate_zigzag_path(start_point, end_point, component_height, tool_width, stepover, overlap,
+                                    "y", orientation)
+    if pattern == "spiral":
+        return generate_spiral_path(start_point, end_point, component_height, tool_width, stepover, overlap,
+                                    orientation)
+    raise ValueError(f"Unknown raster pattern: {pattern}")
+
+
+def plan_raster(start_point, end_point, component_height, tool_width, velocity, acceleration, corner_time=0.0,
+                stepover=None, overlap=None, patterns=RASTER_PATTERNS, orientation=GRINDING_ORIENTATION,
+                deviation=None):
+    """
+    Generate all candidate raster patterns and pick the one with the lowest estimated time.
+    Args:
+        start_point (tuple): Starting (x, y) coordinate in meters
+        end_point (tuple): Ending (x, y) coordinate in meters
+        component_height (float): Height of component in meters
+        tool_width (float): Width of tool in meters
+        velocity (float): Tool velocity in m/s
+        acceleration (float): Tool acceleration in m/s^2
+        corner_time (float): Additional time per corner point
+        stepover (float): Stepover as a fraction of the tool width (default 0.5)
+        overlap (float): Overlap as a fraction of the tool width, alternative to stepover
+        patterns (tuple): Candidate patterns, see RASTER_PATTERNS
+        orientation (tuple): (rx, ry, rz) of the TCP
+        deviation (float): Corner deviation of a blended or streamed path, None for stop-and-go, see path_cost
+    Returns:
+        tuple: (pattern name, (N, 6) corner points, dict of costs per pattern)
+    """
+    best = None
+    costs = {}
+    for pattern in patterns:
+        points = generate_pattern(pattern, start_point, end_point, component_height, tool_width, stepover, overlap,
+                                  orientation)
+        costs[pattern] = path_cost(points, velocity, acceleration, corner_time, deviation)
+        if best is None or costs[pattern]["time"] < costs[best[0]]["time"]:
+            best = (pattern, points)
+    return best[0], best[1], costs
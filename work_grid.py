@@ -0,0 +1,102 @@
+"""Grid of work poses on the fixture, addressed by labels like A1 ... J10"""
+
+import numpy as np
+
+
+def column_label(index):
+    """Spreadsheet style column label: 0 -> A, 25 -> Z, 26 -> AA"""
+    label = ""
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(ord('A') + remainder) + label
+    return label
+
+
+class WorkGrid:
+    """
+    Work poses of the fixture grid stored in one (rows * columns, 6) NumPy array.
+
+    Columns are labelled with letters along x, rows are numbered from 1 along -y,
+    so pose "C4" lies in the third column and the fourth row.
+    """
+
+    def __init__(self, origin=(-0.47, 0.105), columns=10, rows=10, column_pitch=0.07, row_pitch=0.105,
+                 work_height=0.2, orientation=(2.25, 2.25, 0)):
+        """
+        Args:
+            origin (tuple): (x, y) of pose A1 in meters
+            columns (int): Number of columns (letters)
+            rows (int): Number of rows (numbers)
+            column_pitch (float): Distance between columns along +x in meters
+            row_pitch (float): Distance between rows along -y in meters
+            work_height (float): z of all poses in meters
+            orientation (tuple): (rx, ry, rz) of all poses
+        """
+        self.columns = columns
+        self.rows = rows
+        self.column_pitch = column_pitch
+        self.row_pitch = row_pitch
+        self.column_labels = [column_label(i) for i in range(columns)]
+        self.row_labels = [str(i) for i in range(1, rows + 1)]
+
+        row_index, column_index = np.divmod(np.arange(rows * columns), columns)
+        self.poses = np.empty((rows * columns, 6), dtype=float)
+        self.poses[:, 0] = origin[0] + column_index * column_pitch
+        self.poses[:, 1] = origin[1] - row_index * row_pitch
+        self.poses[:, 2] = work_height
+        self.poses[:, 3:] = orientation
+        self.poses.setflags(write=False)
+
+        self.labels = [f"{self.column_labels[c]}{self.row_labels[r]}" for r, c in zip(row_index, column_index)]
+        self._index = {label: i for i, label in enumerate(self.labels)}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self._index
+
+    def __getitem__(self, label):
+        return self.pose(label)
+
+    def index(self, label):
+        """Flat index of a pose label"""
+        try:
+            return self._index[label]
+        except KeyError:
+            raise KeyError(f"Unknown grid pose: {label}") from None
+
+    def label(self, index):
+        """Pose label of a flat index"""
+        return self.labels[index]
+
+    def cell(self, label):
+        """(column_index, row_index) of a pose label"""
+        return tuple(int(value) for value in divmod(self.index(label), self.columns)[::-1])
+
+    def pose(self, label):
+        """Pose (x, y, z, rx, ry, rz) of a label"""
+        return tuple(float(value) for value in self.poses[self.index(label)])
+
+    def indices_in_rectangle(self, corner_a, corner_b):
+        """Flat indices of all poses in the rectangle spanned by two labels, row by row"""
+        column_a, row_a = self.cell(corner_a)
+        column_b, row_b = self.cell(corner_b)
+        rows = np.arange(min(row_a, row_b), max(row_a, row_b) + 1)
+        columns = np.arange(min(column_a, column_b), max(column_a, column_b) + 1)
+        return (rows[:, None] * self.columns + columns[None, :]).ravel()
+
+    def poses_in_rectangle(self, corner_a, corner_b):
+        """(K, 6) array of all poses in the rectangle spanned by two labels"""
+        return self.poses[self.indices_in_rectangle(corner_a, corner_b)]
+
+    def indices_in_area(self, x1, y1, x2, y2):
+        """Flat indices of all poses whose (x, y) lies inside a world coordinate rectangle"""
+        x = self.poses[:, 0]
+        y = self.poses[:, 1]
+        eps = 1e-9  # Poses on the border count as inside
+        inside = ((x >= min(x1, x2) - eps) & (x <= max(x1, x2) + eps) &
+                  (y >= min(y1, y2) - eps) & (y <= max(y1, y2) + eps))
+        return np.flatnonzero(inside)
+